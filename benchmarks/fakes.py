@@ -0,0 +1,119 @@
+"""
+Лёгкие заменители discord.Member / Guild / Interaction для бенчмарков.
+
+Реализуют только то, что реально трогают обработчики Cogs. Вызовы Discord API
+(add_roles, send, timeout, kick, ban, send_message) ничего не делают, но остаются корутинами,
+поэтому время обработчика — это время самого бота (память, БД, event loop).
+"""
+import asyncio
+
+
+class FakeRole:
+    def __init__(self, role_id: int, name: str = "role"):
+        self.id = role_id
+        self.name = name
+
+
+class FakeVoiceChannel:
+    def __init__(self, channel_id: int, guild: "FakeGuild"):
+        self.id = channel_id
+        self.guild = guild
+        self.members: list[FakeMember] = []
+
+
+class FakeVoiceState:
+    def __init__(self, channel: FakeVoiceChannel | None):
+        self.channel = channel
+
+
+class FakeMember:
+    def __init__(self, member_id: int, guild: "FakeGuild", roles: list[FakeRole] = (), bot: bool = False):
+        self.id = member_id
+        self.guild = guild
+        self.roles = list(roles)
+        self.bot = bot
+        self.name = f"user{member_id}"
+        self.display_name = self.name
+        self.mention = f"<@{member_id}>"
+
+    def __str__(self) -> str:
+        return self.name
+
+    async def add_roles(self, *roles, reason=None):
+        self.roles.extend(roles)
+
+    async def send(self, *args, **kwargs):
+        pass
+
+    async def timeout(self, until, reason=None):
+        pass
+
+    async def kick(self, reason=None):
+        pass
+
+
+class FakeGuild:
+    def __init__(self, guild_id: int, voice_channels: int = 0):
+        self.id = guild_id
+        self.name = f"guild{guild_id}"
+        self.afk_channel = None
+        self._roles: dict[int, FakeRole] = {}
+        self._members: dict[int, FakeMember] = {}
+        self.voice_channels = [FakeVoiceChannel(guild_id * 1000 + i, self) for i in range(voice_channels)]
+
+    def add_role(self, role: FakeRole):
+        self._roles[role.id] = role
+
+    def get_role(self, role_id: int) -> FakeRole | None:
+        return self._roles.get(role_id)
+
+    def get_member(self, member_id: int) -> FakeMember | None:
+        return self._members.get(member_id)
+
+    def member(self, member_id: int, roles: list[FakeRole] = ()) -> FakeMember:
+        member = FakeMember(member_id, self, roles)
+        self._members[member_id] = member
+        return member
+
+    async def ban(self, user, reason=None):
+        pass
+
+    async def unban(self, user, reason=None):
+        pass
+
+
+class FakeResponse:
+    def __init__(self):
+        self._done = False
+
+    def is_done(self) -> bool:
+        return self._done
+
+    async def send_message(self, *args, **kwargs):
+        self._done = True
+
+    async def defer(self, *args, **kwargs):
+        self._done = True
+
+
+class FakeInteraction:
+    def __init__(self, user: FakeMember, client: "FakeBot"):
+        self.user = user
+        self.guild = user.guild
+        self.client = client
+        self.response = FakeResponse()
+
+    async def edit_original_response(self, **kwargs):
+        pass
+
+
+class FakeBot:
+    def __init__(self, guilds: list[FakeGuild]):
+        self.guilds = guilds
+        self._cogs = {}
+
+    async def wait_until_ready(self):
+        await asyncio.sleep(0)
+
+    def get_cog(self, name: str):
+        return self._cogs.get(name)
@@ -0,0 +1,240 @@
+"""
+Бенчмарки обработчиков Cogs и путей к БД.
+
+Запуск из корня репозитория:
+    python -m benchmarks.run                       # все сценарии, результат в benchmarks/results/
+    python -m benchmarks.run --scale 0.1           # быстрый прогон
+    python -m benchmarks.run --compare benchmarks/results/<старый>.json
+
+Обработчики — настоящие (Stats, Core, Moderation, utils.helpers), Discord заменён
+заглушками из benchmarks/fakes.py, база — временный SQLite-файл с засеянными данными.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+RESULTS_DIR = REPO_ROOT / "benchmarks" / "results"
+
+
+# === Замеры ===
+class Recorder:
+    def __init__(self):
+        self.results: dict[str, dict] = {}
+
+    def add(self, name: str, latencies: list[float], wall: float):
+        latencies = sorted(latencies)
+        n = len(latencies)
+        self.results[name] = {
+            "n": n,
+            "wall_s": round(wall, 4),
+            "ops_per_s": round(n / wall, 1) if wall else None,
+            "p50_ms": round(latencies[n // 2] * 1000, 4),
+            "p99_ms": round(latencies[min(int(n * 0.99), n - 1)] * 1000, 4),
+            "mean_ms": round(statistics.fmean(latencies) * 1000, 4),
+        }
+        r = self.results[name]
+        print(f"  {name:<28} n={n:<7} {r['ops_per_s']:>10} оп/с   p50 {r['p50_ms']:>8} мс   p99 {r['p99_ms']:>8} мс")
+
+    def add_total(self, name: str, n: int, wall: float):
+        """Сценарий, где важна только общая пропускная способность"""
+        self.results[name] = {"n": n, "wall_s": round(wall, 4), "ops_per_s": round(n / wall, 1) if wall else None}
+        print(f"  {name:<28} n={n:<7} {self.results[name]['ops_per_s']:>10} оп/с   всего {wall * 1000:.1f} мс")
+
+
+async def timed(coro_fn, args_list) -> tuple[list[float], float]:
+    latencies = []
+    t_start = time.perf_counter()
+    for args in args_list:
+        t0 = time.perf_counter()
+        await coro_fn(*args)
+        latencies.append(time.perf_counter() - t0)
+    return latencies, time.perf_counter() - t_start
+
+
+# === Сценарии ===
+async def run_all(scale: float, seed: int) -> dict:
+    # Импорт после chdir: БД и settings.json берутся из временной папки
+    from database import db, init_db
+    from utils.roles import roles
+    from utils.bans import bans
+    from utils.counters import counters
+    from utils.helpers import has_management_access
+    from cogs.core import Core
+    from cogs.moderation import Moderation
+    from cogs.stats import Stats
+    from benchmarks.fakes import FakeBot, FakeGuild, FakeInteraction, FakeRole, FakeVoiceState
+
+    rnd = random.Random(seed)
+    rec = Recorder()
+    init_db()
+
+    # --- Мир: серверы, роли, участники ---
+    guilds = [FakeGuild(guild_id, voice_channels=20) for guild_id in range(1, 6)]
+    bot = FakeBot(guilds)
+    role_ids = {"chief_admin": 11, "admin": 12, "leadership": 13, "default_member": 14}
+    for guild in guilds:
+        for key, role_id in role_ids.items():
+            guild.add_role(FakeRole(role_id, key))
+    for key, role_id in role_ids.items():
+        await roles.set(key, role_id)
+    moderator_role = guilds[0].get_role(role_ids["chief_admin"])
+    members = [guild.member(guild.id * 100_000 + i) for guild in guilds for i in range(400)]
+
+    # --- Данные: большая таблица варнов ---
+    warn_rows = int(100_000 * scale)
+    now = int(time.time())
+    await db.executemany(
+        "INSERT INTO warns (user_id, guild_id, moderator_id, reason, expires_at) VALUES (?, ?, ?, ?, ?)",
+        [(rnd.randrange(10 ** 6), rnd.choice(guilds).id, 1, "seed", now + rnd.randrange(1, 7 * 86400))
+         for _ in range(warn_rows)]
+    )
+    await bans.load()
+    await counters.refresh()
+
+    stats = Stats(bot)
+    core = Core(bot)
+    moderation = Moderation(bot)
+    bot._cogs = {"Stats": stats, "Core": core, "Moderation": moderation}
+    await core.cog_load()
+    await moderation.cog_load()
+
+    print(f"Сценарии (scale={scale}, варнов в таблице: {warn_rows}):")
+
+    # --- 1. Голосовые переходы ---
+    n_voice = int(10_000 * scale)
+    location = {}
+    transitions = []
+    for _ in range(n_voice):
+        member = rnd.choice(members)
+        before = location.get(member.id)
+        after = None if before is not None and rnd.random() < 0.5 else rnd.choice(member.guild.voice_channels)
+        location[member.id] = after
+        transitions.append((member, FakeVoiceState(before), FakeVoiceState(after)))
+    lat, wall = await timed(stats.on_voice_state_update, transitions)
+    rec.add("voice_state_update", lat, wall)
+
+    t0 = time.perf_counter()
+    flushed = await stats.voice_sessions.flush()
+    rec.add_total("voice_flush_rows", max(flushed, 1), time.perf_counter() - t0)
+
+    # --- 2. Волна входов ---
+    n_joins = int(2_000 * scale)
+    joiners = [rnd.choice(guilds).member(10 ** 9 + i) for i in range(n_joins)]
+    lat, wall = await timed(core.on_member_join, [(m,) for m in joiners])
+    rec.add("member_join_handler", lat, wall)
+    t0 = time.perf_counter()
+    while core.joins.processed_dms + core.joins.dropped_dms < n_joins:
+        await asyncio.sleep(0)
+    rec.add_total("member_join_pipeline_drain", n_joins, wall + time.perf_counter() - t0)
+
+    # --- 3. Проверка прав ---
+    n_access = int(100_000 * scale)
+    users = [rnd.choice(members) for _ in range(n_access)]
+    latencies = []
+    t_start = time.perf_counter()
+    for user in users:
+        t0 = time.perf_counter()
+        has_management_access(user)
+        latencies.append(time.perf_counter() - t0)
+    rec.add("has_management_access", latencies, time.perf_counter() - t_start)
+
+    # --- 4. /варн на большой таблице ---
+    n_warns = int(1_000 * scale)
+    moderator = guilds[0].member(1, [moderator_role])
+    targets = [rnd.choice(members[:400]) for _ in range(n_warns)]
+    lat, wall = await timed(
+        lambda target: moderation.warn.callback(moderation, FakeInteraction(moderator, bot), target, "bench"),
+        [(t,) for t in targets]
+    )
+    rec.add("warn_command", lat, wall)
+
+    # --- 5. /статистика ---
+    n_stats = int(2_000 * scale)
+    lat, wall = await timed(
+        lambda: stats.stats.callback(stats, FakeInteraction(moderator, bot)),
+        [()] * n_stats
+    )
+    rec.add("stats_command", lat, wall)
+
+    core.joins.stop()
+    await stats.cog_unload()
+    await core.cog_unload()
+    await moderation.cog_unload()
+    await db.close()
+    return rec.results
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(old_path: str, new: dict):
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)
+    print(f"\nСравнение с {old_path} ({old.get('revision')}):")
+    for name, result in new["results"].items():
+        before = old["results"].get(name)
+        if not before or not before.get("ops_per_s") or not result.get("ops_per_s"):
+            continue
+        change = (result["ops_per_s"] / before["ops_per_s"] - 1) * 100
+        line = f"  {name:<28} {before['ops_per_s']:>10} → {result['ops_per_s']:>10} оп/с ({change:+.1f}%)"
+        if "p99_ms" in result and "p99_ms" in before:
+            line += f"   p99 {before['p99_ms']} → {result['p99_ms']} мс"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарки обработчиков Greenfild Bot")
+    parser.add_argument("--scale", type=float, default=1.0, help="множитель размеров нагрузки")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="куда сохранить JSON (по умолчанию benchmarks/results/<время>.json)")
+    parser.add_argument("--compare", help="JSON предыдущего прогона для сравнения")
+    args = parser.parse_args()
+
+    if str(REPO_ROOT) not in sys.path:
+        sys.path.insert(0, str(REPO_ROOT))
+
+    workdir = tempfile.mkdtemp(prefix="greenfild-bench-")
+    shutil.copy(REPO_ROOT / "settings.json", workdir)
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        results = asyncio.run(run_all(args.scale, args.seed))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "revision": git_revision(),
+        "timestamp": int(time.time()),
+        "python": platform.python_version(),
+        "scale": args.scale,
+        "results": results,
+    }
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}-{report['revision'] or 'local'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"\n💾 Результаты: {output}")
+
+    if args.compare:
+        compare(args.compare, report)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,17 @@
 import discord
 from discord.ext import commands
-import sqlite3
+from database import db
+from utils.cluster import cluster
+from utils.counters import counters
 from utils.helpers import get_role_id, has_management_access
+from utils.paging import KeysetPageView
+from utils.retention import read_history
 
 class Assignment(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
 
-    @discord.app_command.command(name="панель_управления", description="Панель для назначений и модерации")
+    @discord.app_commands.command(name="панель_управления", description="Панель для назначений и модерации")
     async def management_panel(self, interaction: discord.Interaction):
         """Обычная панель управления для Chief Admin, Deputy Chief и Chief Curator"""
         if not has_management_access(interaction.user):
@@ -22,42 +26,134 @@ class Assignment(commands.Cog):
         view = ManagementPanelView(self.bot)
         await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
 
-    @discord.app_command.command(name="статистика_назначений", description="Показать историю всех назначений")
-    async def assignment_stats(self, interaction: discord.Interaction):
-        """Показывает последние 20 назначений"""
+    @discord.app_commands.command(name="статистика_назначений", description="Показать историю всех назначений")
+    @discord.app_commands.choices(тип=[
+        discord.app_commands.Choice(name="Администратор", value="admin"),
+        discord.app_commands.Choice(name="Лидер", value="leader"),
+        discord.app_commands.Choice(name="Медиа", value="movie"),
+    ])
+    async def assignment_stats(self, interaction: discord.Interaction, назначил: discord.User = None,
+                               назначен: discord.User = None, тип: str = None):
+        """История назначений постранично, с фильтрами"""
+        await self.show_assignment_history(
+            interaction,
+            assigner_id=назначил.id if назначил else None,
+            assigned_id=назначен.id if назначен else None,
+            role_type=тип
+        )
+
+    async def show_assignment_history(self, interaction: discord.Interaction, **filters):
+        """Открывает просмотр истории назначений (используется и из главной панели)"""
         if not has_management_access(interaction.user):
             await interaction.response.send_message("❌ У вас нет доступа к этой команде.", ephemeral=True)
             return
 
-        conn = sqlite3.connect("greenfild.db")
-        c = conn.cursor()
-        c.execute("""
-            SELECT assigner_id, assigned_id, role_type, reason, timestamp
-            FROM assignment_logs
-            ORDER BY timestamp DESC
-            LIMIT 20
-        """)
-        records = c.fetchall()
-        conn.close()
-
-        if not records:
+        history_filters = AssignmentFilters(**filters)
+        view = KeysetPageView(
+            lambda cursor, size: fetch_assignment_page(history_filters, cursor, size),
+            lambda row: (row[5], row[0]),
+            lambda rows, page: assignment_history_embed(history_filters, rows, page),
+            HISTORY_PAGE_SIZE,
+            timeout=600
+        )
+        await view.load()
+        if not view.rows:
             await interaction.response.send_message("📭 Нет записей о назначениях.", ephemeral=True)
             return
+        await interaction.response.send_message(embed=view.embed(), view=view, ephemeral=True)
 
-        lines = []
-        for assigner_id, assigned_id, role_type, reason, ts in records:
-            emoji = {"admin": "👤", "leader": "👑", "movie": "🎥"}.get(role_type, "📌")
-            line = f"{emoji} <@{assigner_id}> → <@{assigned_id}> | {reason} (<t:{ts}:R>)"
-            lines.append(line)
 
-        embed = discord.Embed(
-            title="📊 Статистика назначений",
-            description="\n".join(lines),
-            color=0x2ecc71,
-            timestamp=discord.utils.utcnow()
-        )
-        embed.set_footer(text="Последние 20 назначений")
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+# === История назначений: keyset-пагинация по (timestamp, id) ===
+HISTORY_PAGE_SIZE = 10
+
+# Курсор — (timestamp, id) последней строки предыдущей страницы
+HistoryCursor = tuple[int, int] | None
+
+
+class AssignmentFilters:
+    def __init__(self, assigner_id: int | None = None, assigned_id: int | None = None, role_type: str | None = None):
+        self.assigner_id = assigner_id
+        self.assigned_id = assigned_id
+        self.role_type = role_type
+
+    def where(self) -> tuple[list[str], list]:
+        clauses, params = [], []
+        for column in ("assigner_id", "assigned_id", "role_type"):
+            value = getattr(self, column)
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        return clauses, params
+
+    def values(self) -> dict:
+        """Заданные фильтры {столбец: значение} — для поиска по архиву"""
+        return {
+            column: getattr(self, column)
+            for column in ("assigner_id", "assigned_id", "role_type")
+            if getattr(self, column) is not None
+        }
+
+    def describe(self) -> str:
+        parts = []
+        if self.assigner_id:
+            parts.append(f"назначил <@{self.assigner_id}>")
+        if self.assigned_id:
+            parts.append(f"назначен <@{self.assigned_id}>")
+        if self.role_type:
+            parts.append(f"тип `{self.role_type}`")
+        return ", ".join(parts)
+
+
+async def fetch_assignment_page(filters: AssignmentFilters, cursor: HistoryCursor = None,
+                                size: int = HISTORY_PAGE_SIZE) -> list[tuple]:
+    """Страница истории: (id, assigner_id, assigned_id, role_type, reason, timestamp), новые сверху"""
+    clauses, params = filters.where()
+    if cursor is not None:
+        clauses.append("(timestamp, id) < (?, ?)")
+        params.extend(cursor)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    rows = await db.fetchall(f"""
+        SELECT id, assigner_id, assigned_id, role_type, reason, timestamp
+        FROM assignment_logs
+        {where}
+        ORDER BY timestamp DESC, id DESC
+        LIMIT ?
+    """, (*params, size))
+    if len(rows) == size:
+        return rows
+
+    # Живые строки кончились — дальше история из архива (utils/retention.py)
+    archived = await read_history(
+        "assignment_logs", filters.values(), lambda row: (row["timestamp"], row["id"]), cursor, size
+    )
+    seen = {row[0] for row in rows}
+    rows += [
+        (row["id"], row["assigner_id"], row["assigned_id"], row["role_type"], row["reason"], row["timestamp"])
+        for row in archived if row["id"] not in seen
+    ]
+    rows.sort(key=lambda row: (row[5], row[0]), reverse=True)
+    return rows[:size]
+
+
+def assignment_history_embed(filters: AssignmentFilters, rows: list[tuple], page: int) -> discord.Embed:
+    lines = []
+    for _, assigner_id, assigned_id, role_type, reason, ts in rows:
+        emoji = {"admin": "👤", "leader": "👑", "movie": "🎥"}.get(role_type, "📌")
+        short_reason = reason if len(reason) <= 150 else reason[:150] + "…"
+        lines.append(f"{emoji} <@{assigner_id}> → <@{assigned_id}> | {short_reason} (<t:{ts}:R>)")
+
+    embed = discord.Embed(
+        title="📊 Статистика назначений",
+        description="\n".join(lines),
+        color=0x2ecc71,
+        timestamp=discord.utils.utcnow()
+    )
+    described = filters.describe()
+    if described:
+        embed.add_field(name="🔎 Фильтр", value=described, inline=False)
+    embed.set_footer(text=f"Страница {page}")
+    return embed
+
 
 class ManagementPanelView(discord.ui.View):
     def __init__(self, bot):
@@ -134,14 +230,12 @@ class AssignModal(discord.ui.Modal):
             return
 
         # Логируем в БД
-        conn = sqlite3.connect("greenfild.db")
-        c = conn.cursor()
-        c.execute(
+        await db.execute(
             "INSERT INTO assignment_logs (assigner_id, assigned_id, role_type, reason) VALUES (?, ?, ?, ?)",
             (interaction.user.id, user_id, self.role_type, self.reason.value)
         )
-        conn.commit()
-        conn.close()
+        counters.assignments += 1
+        cluster.publish("counters")
 
         # Отправляем уведомление в ЛС
         try:
@@ -1,33 +1,62 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 import os
-import json
+from utils.bans import bans
 from utils.helpers import get_role_id
+from utils.joins import JoinPipeline
+from utils.metrics import metrics
+from utils.settings import settings
 
 def is_owner():
     async def predicate(interaction: discord.Interaction) -> bool:
         owner_id = int(os.getenv("OWNER_ID", 0))
         return interaction.user.id == owner_id
-    return discord.app_command.check(predicate)
+    return discord.app_commands.check(predicate)
 
 class Core(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        # Роль из .env читаем один раз (приоритетнее, чем привязка в БД)
+        env_role_id = os.getenv("ROLE_DEFAULT_MEMBER")
+        self.env_default_role_id = int(env_role_id) if env_role_id and env_role_id.isdigit() else None
+        self.watch_settings.start()
+        # Очередь входов: роль и приветствие обрабатывает пул, а не сам обработчик события
+        self.joins = JoinPipeline(self.grant_default_role, self.send_welcome)
+
+    async def cog_load(self):
+        self.joins.start()
+        # Глубина очередей и лаг приветствий — в !метрики и экспорт (видно отставание во время рейда)
+        metrics.gauges("greenfild_join_pipeline", self.joins.stats)
+
+    async def cog_unload(self):
+        self.watch_settings.cancel()
+        self.joins.stop()
+        metrics.gauges("greenfild_join_pipeline", None)
+
+    @tasks.loop(seconds=10)
+    async def watch_settings(self):
+        """Перечитывает settings.json, если файл изменился"""
+        settings.reload_if_changed()
 
     @commands.Cog.listener()
     async def on_member_join(self, member: discord.Member):
         """Вызывается при входе участника на сервер"""
 
-        # === 1. Выдача стартовой роли ===
-        default_role_id = None
+        # === 0. Глобальный бан — проверка в памяти, до любой другой работы ===
+        if member.id in bans:
+            try:
+                await member.guild.ban(member, reason="Глобальный бан: вход на сервер")
+            except discord.HTTPException as e:
+                print(f"❌ Не удалось забанить {member} (глобальный бан): {e}")
+            return
 
-        # Сначала пробуем из .env
-        env_role_id = os.getenv("ROLE_DEFAULT_MEMBER")
-        if env_role_id and env_role_id.isdigit():
-            default_role_id = int(env_role_id)
-        else:
-            # Если не указано в .env — берём из БД
-            default_role_id = get_role_id("default_member")
+        # === 1-2. Стартовая роль и приветствие — через очередь входов ===
+        self.joins.submit(member)
+
+    async def grant_default_role(self, member: discord.Member):
+        """Выдача стартовой роли (вызывается из очереди входов)"""
+        # Сначала .env, если не указано — привязка из БД (кэш ролей)
+        default_role_id = self.env_default_role_id or get_role_id("default_member")
 
         if default_role_id:
             role = member.guild.get_role(default_role_id)
@@ -39,37 +68,27 @@ class Core(commands.Cog):
                 except Exception as e:
                     print(f"❌ Ошибка выдачи роли: {e}")
 
-        # === 2. Отправка приветствия в ЛС ===
+    async def send_welcome(self, member: discord.Member):
+        """Отправка приветствия в ЛС (вызывается из очереди входов)"""
+        # Текст уже собран из settings.json при загрузке настроек
+        if not settings.welcome_message:
+            return
         try:
-            # Загружаем текст из settings.json
-            with open("settings.json", "r", encoding="utf-8") as f:
-                settings = json.load(f)
-
-            welcome_msg = settings["welcome_message"]
-            social_links = os.getenv("SOCIAL_LINKS", "Соцсети не указаны")
-            final_message = welcome_msg.replace("{social_links}", social_links)
-
-            await member.send(final_message)
+            await member.send(settings.welcome_message)
         except discord.Forbidden:
             # Пользователь закрыл ЛС — игнорируем
             pass
-        except FileNotFoundError:
-            print("❌ Файл settings.json не найден!")
-        except KeyError:
-            print("❌ В settings.json отсутствует поле 'welcome_message'")
         except Exception as e:
             print(f"❌ Ошибка отправки приветствия: {e}")
 
 
-    @discord.app_command.command(name="перезагрузить_приветствие", description="Тестовая команда для владельца")
+    @discord.app_commands.command(name="перезагрузить_приветствие", description="Тестовая команда для владельца")
     @is_owner()
     async def reload_welcome(self, interaction: discord.Interaction):
         """Тестовая команда — отправляет приветствие самому себе"""
         try:
-            with open("settings.json", "r", encoding="utf-8") as f:
-                settings = json.load(f)
-            msg = settings["welcome_message"].replace("{social_links}", os.getenv("SOCIAL_LINKS", ""))
-            await interaction.user.send(msg)
+            settings.reload()
+            await interaction.user.send(settings.welcome_message)
             await interaction.response.send_message("✅ Приветствие отправлено в ЛС.", ephemeral=True)
         except Exception as e:
             await interaction.response.send_message(f"❌ Ошибка: {e}", ephemeral=True)
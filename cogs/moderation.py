@@ -1,10 +1,72 @@
 import discord
-from discord.ext import commands, tasks
-import sqlite3
+from discord.ext import commands
+import asyncio
+import datetime
 import time
-import aiohttp
 import os
-from utils.helpers import get_role_id
+from database import db
+from utils.bans import bans
+from utils.cluster import cluster
+from utils.counters import counters
+from utils.replication import BanReplicator
+from utils.roles import roles
+from utils.scheduler import ExpiryScheduler
+from utils.settings import settings
+from utils.warns import active_warns
+from utils.webhooks import WebhookDispatcher
+
+# Сколько серверов обрабатываем параллельно при глобальном бане/разбане.
+# Лимиты по маршрутам (429) соблюдает HTTP-клиент discord.py, семафор не даёт упереться в глобальный лимит.
+FAN_OUT_CONCURRENCY = 8
+# Как часто обновлять сообщение с прогрессом (секунды)
+PROGRESS_INTERVAL = 1.5
+# Максимальный тайм-аут участника в Discord (28 дней)
+MAX_TIMEOUT = 28 * 86400
+
+
+async def fan_out(guilds, action, progress=None, concurrency: int = FAN_OUT_CONCURRENCY):
+    """
+    Выполняет action(guild) на всех серверах с ограниченной параллельностью.
+
+    progress(done, total) вызывается периодически, пока идёт обработка.
+    Возвращает (успешные серверы, [(сервер, ошибка), ...]).
+    """
+    guilds = list(guilds)
+    semaphore = asyncio.Semaphore(concurrency)
+    succeeded, failed = [], []
+
+    async def run(guild):
+        async with semaphore:
+            try:
+                await action(guild)
+                succeeded.append(guild)
+            except Exception as e:
+                failed.append((guild, e))
+
+    pending = {asyncio.create_task(run(guild)) for guild in guilds}
+    while pending:
+        _, pending = await asyncio.wait(pending, timeout=PROGRESS_INTERVAL)
+        if progress and pending:
+            try:
+                await progress(len(succeeded) + len(failed), len(guilds))
+            except discord.HTTPException:
+                pass
+    return succeeded, failed
+
+
+def describe_failures(failed) -> list[tuple[str, str]]:
+    """[(сервер, ошибка)] → [(имя сервера, тип ошибки)] — в таком виде ошибки приходят и от других процессов"""
+    return [(guild.name, type(error).__name__) for guild, error in failed]
+
+
+def format_failures(failed: list[tuple[str, str]], limit: int = 10) -> str:
+    """Краткий список серверов, где действие не удалось"""
+    if not failed:
+        return ""
+    lines = [f"• {guild_name} — {error_name}" for guild_name, error_name in failed[:limit]]
+    if len(failed) > limit:
+        lines.append(f"…и ещё {len(failed) - limit}")
+    return "\n**Ошибки:**\n" + "\n".join(lines)
 
 
 # === Модальное окно для глобального бана (используется из других Cogs) ===
@@ -47,26 +109,56 @@ class GlobalBanModal(discord.ui.Modal, title="🌍 Глобальный бан")
             return
 
         try:
-            # Вызываем команду напрямую
-            await cog.global_ban(interaction, user, self.duration.value, self.reason.value)
+            await cog.apply_global_ban(interaction, user, self.duration.value, self.reason.value)
         except Exception as e:
-            await interaction.response.send_message(f"❌ Ошибка при бане: {e}", ephemeral=True)
+            if interaction.response.is_done():
+                await interaction.followup.send(f"❌ Ошибка при бане: {e}", ephemeral=True)
+            else:
+                await interaction.response.send_message(f"❌ Ошибка при бане: {e}", ephemeral=True)
 
 
 # === Основной Cog модерации ===
 class Moderation(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.check_expired_warns.start()
+
+        # Сроки варнов и временных глобальных банов
+        self.expiry = ExpiryScheduler()
+        self.expiry.register("warn", self.expire_warns)
+        self.expiry.register("tempban", self.expire_temp_bans)
+        self.expiry.register("ban", self.expire_bans)
+
+        webhook_url = os.getenv("BAN_SYNC_WEBHOOK_URL")
+        self.ban_webhook = WebhookDispatcher(
+            webhook_url,
+            username="Greenfild Ban Sync",
+            avatar_url="https://i.imgur.com/5GkzFQl.png"
+        ) if webhook_url else None
+
+        # Баны других инстансов бота (журнал ban_journal)
+        self.replicator = BanReplicator(self.apply_replicated_bans)
+
+    async def cog_load(self):
+        # БД уже инициализирована в main до загрузки Cogs
+        await self.load_deadlines()
+        self.expiry.start()
+        if self.ban_webhook:
+            self.ban_webhook.start()
+        cluster.on("global_ban", self.on_cluster_ban)
+        cluster.on("global_unban", self.on_cluster_unban)
+        self.replicator.start()
+
+    async def cog_unload(self):
+        cluster.off("global_ban")
+        cluster.off("global_unban")
+        self.replicator.stop()
+        self.expiry.stop()
+        if self.ban_webhook:
+            await self.ban_webhook.close()
 
     def has_moderator_role(self, user: discord.Member) -> bool:
         """Проверяет, есть ли у пользователя роль модератора"""
-        mod_roles = ["chief_admin", "deputy_chief", "chief_curator", "senior_admin", "admin"]
-        for role_key in mod_roles:
-            role_id = get_role_id(role_key)
-            if role_id and role_id in [r.id for r in user.roles]:
-                return True
-        return False
+        return roles.has_access(user, "moderator")
 
     def parse_duration(self, s: str) -> int:
         """Преобразует '7d', '2h' в секунды. '0' = навсегда."""
@@ -80,142 +172,235 @@ class Moderation(commands.Cog):
         mult = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
         return amount * mult.get(unit, 0)
 
-    async def send_ban_webhook(self, url: str, user: discord.User, moderator: discord.User, reason: str, expires: str):
-        """Отправляет уведомление о бане в webhook"""
-        async with aiohttp.ClientSession() as session:
-            embed = {
-                "title": "🌍 Глобальный бан",
-                "description": f"**Пользователь:** {user.mention}\n**Модератор:** {moderator.mention}\n**Причина:** {reason}\n**Срок:** {expires}",
-                "color": 0xe74c3c,
-                "timestamp": discord.utils.utcnow().isoformat()
-            }
-            payload = {
-                "username": "Greenfild Ban Sync",
-                "avatar_url": "https://i.imgur.com/5GkzFQl.png",
-                "embeds": [embed]
-            }
-            try:
-                await session.post(url, json=payload)
-            except Exception as e:
-                print(f"Ошибка отправки webhook: {e}")
+    def send_ban_webhook(self, user: discord.User, moderator: discord.User, reason: str, expires: str):
+        """Ставит уведомление о бане в очередь webhook (доставка пачками в фоне)"""
+        if not self.ban_webhook:
+            return
+        self.ban_webhook.send({
+            "title": "🌍 Глобальный бан",
+            "description": f"**Пользователь:** {user.mention}\n**Модератор:** {moderator.mention}\n**Причина:** {reason}\n**Срок:** {expires}",
+            "color": 0xe74c3c,
+            "timestamp": discord.utils.utcnow().isoformat()
+        })
 
-    @discord.app_command.command(name="глобалбан", description="Забанить пользователя на всех серверах проекта")
+    @discord.app_commands.command(name="глобалбан", description="Забанить пользователя на всех серверах проекта")
     async def global_ban(self, interaction: discord.Interaction, пользователь: discord.User, срок: str = "0", причина: str = "Не указана"):
+        await self.apply_global_ban(interaction, пользователь, срок, причина)
+
+    def progress_reporter(self, interaction: discord.Interaction, title: str):
+        """Возвращает callback, который обновляет отложенный ответ прогрессом"""
+        async def report(done: int, total: int):
+            await interaction.edit_original_response(content=f"⏳ {title}: {done}/{total} серверов...")
+        return report
+
+    async def apply_global_ban(self, interaction: discord.Interaction, пользователь: discord.User, срок: str, причина: str):
+        """Глобальный бан: запись в БД и параллельная рассылка по всем серверам"""
         if not self.has_moderator_role(interaction.user):
             await interaction.response.send_message("❌ У вас нет прав на выдачу банов.", ephemeral=True)
             return
 
+        # Отвечаем сразу — рассылка по серверам может занять дольше 3 секунд
+        await interaction.response.defer(ephemeral=True, thinking=True)
+
         seconds = self.parse_duration(срок)
         expires_at = int(time.time()) + seconds if seconds > 0 else None
         expires_str = "навсегда" if expires_at is None else срок
 
-        conn = sqlite3.connect("greenfild.db")
-        c = conn.cursor()
-        c.execute(
-            "INSERT OR REPLACE INTO global_bans (user_id, reason, banned_by, expires_at) VALUES (?, ?, ?, ?)",
-            (пользователь.id, причина, interaction.user.id, expires_at)
-        )
-        conn.commit()
-        conn.close()
+        recorded = False
+        try:
+            await bans.ban(пользователь.id, причина, interaction.user.id, expires_at)
+            recorded = True
+            self.schedule_ban_expiry(пользователь.id, expires_at)
 
-        ban_count = 0
-        for guild in self.bot.guilds:
+            succeeded, failed = await self.ban_everywhere(
+                пользователь.id, f"Глобальный бан: {причина}", expires_at,
+                progress=self.progress_reporter(interaction, "Бан"),
+            )
+        except Exception as e:
+            # При любой ошибке отвечаем, чтобы у модератора не осталось «думает…»
+            reason = (e.text or str(e)) if isinstance(e, discord.HTTPException) else "внутренняя ошибка бота"
+            content = (
+                f"⚠️ Бан {пользователь.mention} записан, но рассылка по серверам прервалась: {reason}"
+                if recorded else f"❌ Не удалось выдать глобальный бан: {reason}"
+            )
             try:
-                await guild.ban(пользователь, reason=f"Глобальный бан: {причина}")
-                ban_count += 1
-            except discord.Forbidden:
+                await interaction.followup.send(content, ephemeral=True)
+            except discord.HTTPException:
                 pass
+            if not isinstance(e, discord.HTTPException):
+                # Неожиданная ошибка — дальше в обработчик ошибок дерева команд (лог с трейсбеком)
+                raise
+            return
 
-        webhook_url = os.getenv("BAN_SYNC_WEBHOOK_URL")
-        if webhook_url:
-            await self.send_ban_webhook(webhook_url, пользователь, interaction.user, причина, expires_str)
+        self.send_ban_webhook(пользователь, interaction.user, причина, expires_str)
+
+        await interaction.edit_original_response(
+            content=f"🌍 Пользователь {пользователь.mention} забанен глобально {'навсегда' if expires_at is None else f'на {срок}'}. "
+                    f"Забанен на {succeeded}/{succeeded + len(failed)} серверах."
+                    + format_failures(failed)
+        )
+
+    # === Рассылка по серверам всех процессов кластера ===
+    def schedule_ban_expiry(self, user_id: int, expires_at: int | None):
+        """Сроки глобальных банов ведёт только основной процесс — иначе разбан ушёл бы N раз"""
+        if not cluster.primary:
+            return
+        if expires_at is None:
+            self.expiry.cancel("ban", user_id)
+        else:
+            self.expiry.schedule("ban", user_id, expires_at)
+
+    @staticmethod
+    def merge_replies(succeeded: int, failed: list, replies: list[dict]) -> tuple[int, list[tuple[str, str]]]:
+        """Складывает итоги своих серверов с ответами других процессов"""
+        for reply in replies:
+            succeeded += reply.get("succeeded", 0)
+            failed += [tuple(failure) for failure in reply.get("failed", [])]
+            if "error" in reply:
+                failed.append(("другой процесс", reply["error"]))
+        return succeeded, failed
+
+    async def ban_everywhere(self, user_id: int, reason: str, expires_at: int | None, progress=None):
+        """Бан на своих серверах и, параллельно, на серверах остальных процессов; → (успешно, ошибки)"""
+        (succeeded, failed), replies = await asyncio.gather(
+            fan_out(self.bot.guilds, lambda guild: guild.ban(discord.Object(id=user_id), reason=reason), progress=progress),
+            cluster.request("global_ban", user_id=user_id, reason=reason, expires_at=expires_at),
+        )
+        return self.merge_replies(len(succeeded), describe_failures(failed), replies)
+
+    async def unban_everywhere(self, user_id: int, reason: str, progress=None):
+        (succeeded, failed), replies = await asyncio.gather(
+            self.unban_here(user_id, reason, progress),
+            cluster.request("global_unban", user_id=user_id, reason=reason),
+        )
+        return self.merge_replies(len(succeeded), describe_failures(failed), replies)
+
+    async def unban_here(self, user_id: int, reason: str, progress=None):
+        succeeded, failed = await fan_out(
+            self.bot.guilds,
+            lambda guild: guild.unban(discord.Object(id=user_id), reason=reason),
+            progress=progress,
+        )
+        # NotFound — на этом сервере бана и не было, это не ошибка
+        return succeeded, [(guild, e) for guild, e in failed if not isinstance(e, discord.NotFound)]
 
-        await interaction.response.send_message(
-            f"🌍 Пользователь {пользователь.mention} забанен глобально {'навсегда' if expires_at is None else f'на {срок}'}. "
-            f"Забанен на {ban_count} серверах.",
-            ephemeral=True
+    async def on_cluster_ban(self, data: dict) -> dict:
+        """Глобальный бан, выданный в другом процессе: кэш, срок и свои серверы"""
+        user_id = data["user_id"]
+        # Запись уже в общей БД — кэш догоняет её по журналу
+        await bans.sync()
+        self.schedule_ban_expiry(user_id, data["expires_at"])
+        succeeded, failed = await fan_out(
+            self.bot.guilds,
+            lambda guild: guild.ban(discord.Object(id=user_id), reason=data["reason"])
         )
+        return {"succeeded": len(succeeded), "failed": describe_failures(failed)}
 
-    @discord.app_command.command(name="глобалразбан", description="Снять глобальный бан")
-    async def global_unban(self, interaction: discord.Interegration, пользователь: discord.User):
+    async def on_cluster_unban(self, data: dict) -> dict:
+        user_id = data["user_id"]
+        await bans.sync()
+        self.expiry.cancel("ban", user_id)
+        succeeded, failed = await self.unban_here(user_id, data["reason"])
+        return {"succeeded": len(succeeded), "failed": describe_failures(failed)}
+
+    @discord.app_commands.command(name="глобалразбан", description="Снять глобальный бан")
+    async def global_unban(self, interaction: discord.Interaction, пользователь: discord.User):
         if not self.has_moderator_role(interaction.user):
             await interaction.response.send_message("❌ У вас нет прав на снятие банов.", ephemeral=True)
             return
 
-        conn = sqlite3.connect("greenfild.db")
-        c = conn.cursor()
-        c.execute("DELETE FROM global_bans WHERE user_id = ?", (пользователь.id,))
-        deleted = c.rowcount
-        conn.commit()
-        conn.close()
+        await interaction.response.defer(ephemeral=True, thinking=True)
+
+        deleted = await bans.unban(пользователь.id)
+        self.expiry.cancel("ban", пользователь.id)
 
         if deleted:
-            unban_count = 0
-            for guild in self.bot.guilds:
-                try:
-                    await guild.unban(пользователь)
-                    unban_count += 1
-                except:
-                    pass
-            await interaction.response.send_message(
-                f"✅ Глобальный бан с {пользователь.mention} снят. Разбанен на {unban_count} серверах.",
-                ephemeral=True
+            succeeded, failed = await self.unban_everywhere(
+                пользователь.id, "Снятие глобального бана",
+                progress=self.progress_reporter(interaction, "Разбан"),
+            )
+            await interaction.edit_original_response(
+                content=f"✅ Глобальный бан с {пользователь.mention} снят. Разбанен на {succeeded} серверах."
+                        + format_failures(failed)
             )
         else:
-            await interaction.response.send_message("❌ Пользователь не в глобальном бане.", ephemeral=True)
+            await interaction.edit_original_response(content="❌ Пользователь не в глобальном бане.")
 
-    @discord.app_command.command(name="варн", description="Выдать предупреждение участнику")
+    @discord.app_commands.command(name="варн", description="Выдать предупреждение участнику")
     async def warn(self, interaction: discord.Interaction, участник: discord.Member, причина: str = "Не указана"):
         if not self.has_moderator_role(interaction.user):
             await interaction.response.send_message("❌ У вас нет прав на выдачу предупреждений.", ephemeral=True)
             return
 
-        expires_at = int(time.time()) + 7 * 86400  # 7 дней
+        now = int(time.time())
+        expires_at = now + settings.warn_duration_days * 86400
 
-        conn = sqlite3.connect("greenfild.db")
-        c = conn.cursor()
-        c.execute(
+        # Один INSERT: число активных варнов — из памяти, без COUNT по таблице
+        cursor = await db.execute(
             "INSERT INTO warns (user_id, guild_id, moderator_id, reason, expires_at) VALUES (?, ?, ?, ?, ?)",
             (участник.id, interaction.guild.id, interaction.user.id, причина, expires_at)
         )
-        c.execute(
-            "SELECT COUNT(*) FROM warns WHERE user_id = ? AND guild_id = ? AND expires_at > ?",
-            (участник.id, interaction.guild.id, int(time.time()))
-        )
-        active_warns = c.fetchone()[0]
-        conn.commit()
-        conn.close()
+        active_warns.add(cursor.lastrowid, участник.id, interaction.guild.id, причина, expires_at)
+        active = active_warns.count(участник.id, interaction.guild.id, now)
+        self.expiry.schedule("warn", cursor.lastrowid, expires_at)
+        counters.warns += 1
+        cluster.publish("counters")
 
-        max_warns = 3
-        if active_warns >= max_warns:
-            try:
-                await interaction.guild.ban(участник, reason=f"Превышено количество предупреждений ({active_warns})")
-                await interaction.response.send_message(
-                    f"🚫 {участник.mention} забанен за превышение лимита предупреждений ({active_warns}/{max_warns})."
-                )
-            except discord.Forbidden:
-                await interaction.response.send_message(
-                    f"⚠️ {участник.mention} получил {active_warns}-й варн, но у бота нет прав на бан."
-                )
-        else:
+        ladder = settings.warn_escalation
+        top = ladder[-1]["warns"]
+        step = next((step for step in reversed(ladder) if active >= step["warns"]), None)
+        if step is None:
             await interaction.response.send_message(
-                f"⚠️ {участник.mention} получил предупреждение ({active_warns}/{max_warns}).\nПричина: {причина}"
+                f"⚠️ {участник.mention} получил предупреждение ({active}/{top}).\nПричина: {причина}"
             )
+            return
+
+        if step["action"] == "global_ban":
+            # Рассылка по всем серверам может занять дольше 3 секунд
+            await interaction.response.defer(thinking=True)
+        outcome = await self.escalate(interaction.guild, участник, interaction.user, step, active)
+        content = f"⚠️ {участник.mention} получил предупреждение ({active}/{top}).\nПричина: {причина}\n{outcome}"
+        if interaction.response.is_done():
+            await interaction.edit_original_response(content=content)
+        else:
+            await interaction.response.send_message(content)
 
-    @discord.app_command.command(name="варны", description="Посмотреть активные предупреждения участника")
+    async def escalate(self, guild: discord.Guild, member: discord.Member, moderator: discord.User, step: dict, active: int) -> str:
+        """Применяет шаг лестницы эскалации; возвращает строку для ответа модератору"""
+        action, duration = step["action"], step["duration"]
+        seconds = self.parse_duration(duration)
+        term = "навсегда" if seconds <= 0 else f"на {duration}"
+        reason = f"Эскалация варнов ({active} активных)"
+        try:
+            if action == "timeout":
+                # Discord ограничивает тайм-аут 28 днями
+                seconds = min(seconds or MAX_TIMEOUT, MAX_TIMEOUT)
+                await member.timeout(datetime.timedelta(seconds=seconds), reason=reason)
+                return f"🔇 Тайм-аут на {duration if seconds < MAX_TIMEOUT else '28d'}."
+            if action == "kick":
+                await member.kick(reason=reason)
+                return "👢 Исключён с сервера."
+            if action == "ban":
+                await guild.ban(member, reason=reason)
+                await self.schedule_temp_ban(guild.id, member.id, int(time.time()) + seconds if seconds > 0 else None)
+                return f"🚫 Забанен на сервере {term}."
+            # global_ban
+            expires_at = int(time.time()) + seconds if seconds > 0 else None
+            await bans.ban(member.id, reason, moderator.id, expires_at)
+            self.schedule_ban_expiry(member.id, expires_at)
+            succeeded, failed = await self.ban_everywhere(member.id, f"Глобальный бан: {reason}", expires_at)
+            self.send_ban_webhook(member, moderator, reason, "навсегда" if expires_at is None else duration)
+            return f"🌍 Глобальный бан {term}: забанен на {succeeded}/{succeeded + len(failed)} серверах." + format_failures(failed)
+        except discord.Forbidden:
+            return f"⚠️ Лестница требует «{action}», но у бота нет прав."
+
+    @discord.app_commands.command(name="варны", description="Посмотреть активные предупреждения участника")
     async def warns(self, interaction: discord.Interaction, участник: discord.Member):
         if not self.has_moderator_role(interaction.user):
             await interaction.response.send_message("❌ У вас нет доступа к этой команде.", ephemeral=True)
             return
 
-        conn = sqlite3.connect("greenfild.db")
-        c = conn.cursor()
-        c.execute(
-            "SELECT reason, expires_at FROM warns WHERE user_id = ? AND guild_id = ? AND expires_at > ?",
-            (участник.id, interaction.guild.id, int(time.time()))
-        )
-        records = c.fetchall()
-        conn.close()
+        records = active_warns.active(участник.id, interaction.guild.id, int(time.time()))
 
         if not records:
             await interaction.response.send_message(f"✅ У {участник.mention} нет активных предупреждений.", ephemeral=True)
@@ -232,19 +417,84 @@ class Moderation(commands.Cog):
         )
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
-    @tasks.loop(hours=1)
-    async def check_expired_warns(self):
-        """Удаляет просроченные предупреждения (старше 7 дней)"""
-        conn = sqlite3.connect("greenfild.db")
-        c = conn.cursor()
-        now = int(time.time())
-        c.execute("DELETE FROM warns WHERE expires_at <= ?", (now,))
-        conn.commit()
-        conn.close()
+    async def apply_replicated_bans(self, entries: list):
+        """Баны и разбаны из журнала другого инстанса: сроки и рассылка по своим серверам"""
+        for _, action, user_id, reason, _, expires_at, origin in entries:
+            if action == "ban":
+                self.schedule_ban_expiry(user_id, expires_at)
+                succeeded, failed = await self.ban_everywhere(user_id, f"Глобальный бан ({origin}): {reason}", expires_at)
+                print(f"🔁 Бан {user_id} от {origin}: забанен на {succeeded} серверах, ошибок {len(failed)}")
+            else:
+                self.expiry.cancel("ban", user_id)
+                succeeded, _ = await self.unban_everywhere(user_id, f"Снятие глобального бана ({origin})")
+                print(f"🔁 Разбан {user_id} от {origin}: разбанен на {succeeded} серверах")
+
+    # === Сроки: варны и временные баны ===
+    async def load_deadlines(self):
+        """Загружает варны своих серверов, временные баны и (в основном процессе) сроки глобальных банов"""
+        try:
+            await active_warns.load()
+            temp_bans = await db.fetchall(
+                f"SELECT guild_id, user_id, expires_at FROM temp_bans WHERE {cluster.guild_filter()}"
+            )
+            timed_bans = await db.fetchall(
+                "SELECT user_id, expires_at FROM global_bans WHERE expires_at IS NOT NULL"
+            ) if cluster.primary else []
+        except Exception as e:
+            print(f"❌ Ошибка загрузки сроков: {e}")
+            return
+
+        self.expiry.clear("warn")
+        self.expiry.clear("tempban")
+        self.expiry.clear("ban")
+        for warn_id, expires_at in active_warns.deadlines():
+            self.expiry.schedule("warn", warn_id, expires_at)
+        for guild_id, user_id, expires_at in temp_bans:
+            self.expiry.schedule("tempban", (guild_id, user_id), expires_at)
+        for user_id, expires_at in timed_bans:
+            self.expiry.schedule("ban", user_id, expires_at)
+        print(f"⏰ Загружено сроков: варнов {len(active_warns)}, временных банов {len(temp_bans)}, "
+              f"глобальных временных банов {len(timed_bans)}")
+
+    async def schedule_temp_ban(self, guild_id: int, user_id: int, expires_at: int | None):
+        """Бан на одном сервере по лестнице эскалации; None — навсегда (срок не храним)"""
+        if expires_at is None:
+            await db.execute("DELETE FROM temp_bans WHERE guild_id = ? AND user_id = ?", (guild_id, user_id))
+            self.expiry.cancel("tempban", (guild_id, user_id))
+            return
+        await db.execute(
+            "INSERT OR REPLACE INTO temp_bans (guild_id, user_id, expires_at) VALUES (?, ?, ?)",
+            (guild_id, user_id, expires_at)
+        )
+        self.expiry.schedule("tempban", (guild_id, user_id), expires_at)
+
+    async def expire_temp_bans(self, keys: list[tuple[int, int]]):
+        """Снимает истёкшие временные баны на серверах"""
+        await db.executemany("DELETE FROM temp_bans WHERE guild_id = ? AND user_id = ?", keys)
+        for guild_id, user_id in keys:
+            guild = self.bot.get_guild(guild_id)
+            if guild is None:
+                continue
+            try:
+                await guild.unban(discord.Object(id=user_id), reason="Срок бана за варны истёк")
+            except discord.NotFound:
+                pass
+
+    async def expire_warns(self, warn_ids: list[int]):
+        """Снимает истёкшие предупреждения"""
+        deadlines = [active_warns.deadline(warn_id) for warn_id in warn_ids]
+        deleted = await db.executemany("DELETE FROM warns WHERE id = ?", [(warn_id,) for warn_id in warn_ids])
+        active_warns.remove(warn_ids)
+        counters.expire_warns(deadlines, deleted)
+        if deleted:
+            cluster.publish("counters")
 
-    @check_expired_warns.before_loop
-    async def before_check_warns(self):
-        await self.bot.wait_until_ready()
+    async def expire_bans(self, user_ids: list[int]):
+        """Снимает истёкшие глобальные баны и разбанивает на всех серверах"""
+        expired = await bans.expire(user_ids, int(time.time()))
+        for user_id in expired:
+            succeeded, _ = await self.unban_everywhere(user_id, "Срок глобального бана истёк")
+            print(f"⏰ Глобальный бан {user_id} истёк, разбанен на {succeeded} серверах")
 
 
 async def setup(bot: commands.Bot):
@@ -1,20 +1,17 @@
 import discord
 from discord.ext import commands
-import sqlite3
-from utils.helpers import get_role_id
+from utils.counters import counters
+from utils.roles import roles
 
 def has_leadership_access(user: discord.Member) -> bool:
     """Проверяет доступ к главной панели"""
-    leadership_id = get_role_id("leadership")
-    team_id = get_role_id("project_team")
-    user_roles = [r.id for r in user.roles]
-    return (leadership_id in user_roles) or (team_id in user_roles)
+    return roles.has_access(user, "leadership")
 
 class Panels(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
 
-    @discord.app_command.command(name="панель_главная", description="Главная панель управления (только для Руководства и Команды)")
+    @discord.app_commands.command(name="панель_главная", description="Главная панель управления (только для Руководства и Команды)")
     async def main_panel(self, interaction: discord.Interaction):
         if not has_leadership_access(interaction.user):
             await interaction.response.send_message(
@@ -78,14 +75,7 @@ class MainPanelView(discord.ui.View):
                 await interaction.response.send_message("❌ Роль не найдена на этом сервере.", ephemeral=True)
                 return
 
-            conn = sqlite3.connect("greenfild.db")
-            c = conn.cursor()
-            c.execute(
-                "INSERT OR REPLACE INTO project_roles (role_name, role_id) VALUES (?, ?)",
-                (role_name.value.strip().lower(), r_id)
-            )
-            conn.commit()
-            conn.close()
+            await roles.set(role_name.value.strip().lower(), r_id)
 
             await interaction.response.send_message(
                 f"✅ Роль `{role.name}` привязана к ключу `{role_name.value.strip().lower()}`.",
@@ -97,13 +87,8 @@ class MainPanelView(discord.ui.View):
 
     @discord.ui.button(label="📊 Статистика проекта", style=discord.ButtonStyle.primary, emoji="📊")
     async def project_stats(self, interaction: discord.Interaction, button: discord.ui.Button):
-        conn = sqlite3.connect("greenfild.db")
-        c = conn.cursor()
-        c.execute("SELECT COUNT(*) FROM global_bans")
-        total_bans = c.fetchone()[0]
-        c.execute("SELECT COUNT(*) FROM assignment_logs")
-        total_assignments = c.fetchone()[0]
-        conn.close()
+        total_bans = counters.global_bans
+        total_assignments = counters.assignments
 
         embed = discord.Embed(
             title="📈 Статистика Greenfild Project",
@@ -118,7 +103,7 @@ class MainPanelView(discord.ui.View):
     @discord.ui.button(label="🔍 Аудит назначений", style=discord.ButtonStyle.secondary, emoji="🔍")
     async def audit_assignments(self, interaction: discord.Interaction, button: discord.ui.Button):
         cog = interaction.client.get_cog("Assignment")
-        if cog and hasattr(cog, 'assignment_stats'):
-            await cog.assignment_stats(interaction)
+        if cog and hasattr(cog, 'show_assignment_history'):
+            await cog.show_assignment_history(interaction)
         else:
             await interaction.response.send_message("❌ Модуль назначений недоступен.", ephemeral=True)
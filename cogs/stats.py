@@ -1,32 +1,39 @@
 import discord
 from discord.ext import commands, tasks
-import sqlite3
+import asyncio
 import time
+from utils.cluster import cluster
+from utils.counters import counters
 from utils.helpers import get_role_id
+from utils.leaderboard import VoiceLeaderboard, PAGE_SIZE
+from utils.paging import KeysetPageView
+from utils.presence import presence
+from utils.settings import settings
+from utils.tickets import tickets
+from utils.voice import VoiceSessionBuffer
 
 
 # === Вспомогательный View для техподдержки ===
 class TechTicketView(discord.ui.View):
-    def __init__(self, channel_id: int):
+    """
+    Кнопки заявки. Постоянный View: custom_id фиксированы, один экземпляр регистрируется
+    через bot.add_view при загрузке Cog и обслуживает все заявки, в том числе после рестарта.
+    Заявка определяется по каналу через индекс tickets — без запроса к БД.
+    """
+
+    def __init__(self):
         super().__init__(timeout=None)
-        self.channel_id = channel_id
 
-    @discord.ui.button(label="✅ Принять заявку", style=discord.ButtonStyle.green, emoji="✅")
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if tickets.get(interaction.channel_id) is None:
+            await interaction.response.send_message("❌ Эта заявка уже закрыта.", ephemeral=True)
+            return False
+        return True
+
+    @discord.ui.button(label="✅ Принять заявку", style=discord.ButtonStyle.green, emoji="✅", custom_id="tech_ticket:accept")
     async def accept_ticket(self, interaction: discord.Interaction, button: discord.ui.Button):
+        ticket = tickets.get(interaction.channel_id)
         channel = interaction.channel
-        if not channel:
-            return
-
-        # Получаем ID автора заявки
-        author_id = None
-        conn = sqlite3.connect("greenfild.db")
-        c = conn.cursor()
-        c.execute("SELECT user_id FROM tech_tickets WHERE channel_id = ?", (self.channel_id,))
-        row = c.fetchone()
-        conn.close()
-
-        if row:
-            author_id = row[0]
 
         # Новые права канала
         overwrites = {
@@ -35,25 +42,69 @@ class TechTicketView(discord.ui.View):
         }
 
         # Добавляем автора и принимающего
-        if author_id:
-            author = interaction.guild.get_member(author_id)
-            if author:
-                overwrites[author] = discord.PermissionOverwrite(read_messages=True, send_messages=True)
+        author = interaction.guild.get_member(ticket.user_id)
+        if author:
+            overwrites[author] = discord.PermissionOverwrite(read_messages=True, send_messages=True)
 
         overwrites[interaction.user] = discord.PermissionOverwrite(read_messages=True, send_messages=True)
 
         await channel.edit(overwrites=overwrites)
+        await tickets.accept(ticket, interaction.user.id)
         await interaction.response.send_message("✅ Заявка принята. Другие техники удалены из канала.")
 
-    @discord.ui.button(label="🔒 Закрыть", style=discord.ButtonStyle.red, emoji="🔒")
+    @discord.ui.button(label="🔒 Закрыть", style=discord.ButtonStyle.red, emoji="🔒", custom_id="tech_ticket:close")
     async def close_ticket(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await tickets.close(tickets.get(interaction.channel_id))
         await interaction.channel.delete(reason="Заявка закрыта")
 
 
+# === Топ по онлайну с постраничным просмотром ===
+def leaderboard_embed(title: str, rows: list[tuple[int, int]], page: int) -> discord.Embed:
+    offset = (page - 1) * PAGE_SIZE
+    lines = [
+        f"**{offset + i}.** <@{user_id}> — {seconds // 3600} ч {seconds % 3600 // 60} мин"
+        for i, (user_id, seconds) in enumerate(rows, start=1)
+    ]
+    embed = discord.Embed(
+        title=title,
+        description="\n".join(lines) or "📭 Пока нет данных.",
+        color=0x3498db,
+        timestamp=discord.utils.utcnow()
+    )
+    embed.set_footer(text=f"Страница {page}")
+    return embed
+
+
+def is_tracked_channel(channel) -> bool:
+    """Считается ли канал для онлайна (AFK-канал не учитывается)"""
+    return channel is not None and channel != channel.guild.afk_channel
+
+
 # === Основной Cog ===
 class Stats(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self.voice_sessions = VoiceSessionBuffer(
+            heartbeat_key=cluster.meta_key("voice_heartbeat"),
+            scope=cluster.guild_filter()
+        )
+        self.leaderboard = VoiceLeaderboard(self.voice_sessions)
+        # Техподдержка: категория заявок по серверам и заявки, которые сейчас создаются
+        self._ticket_categories: dict[int, int] = {}
+        self._category_locks: dict[int, asyncio.Lock] = {}
+        self._tickets_in_progress: dict[tuple[int, int], int] = {}
+        self.flush_voice_sessions.start()
+        self.verify_counters.start()
+
+    async def cog_load(self):
+        # Кнопки заявок работают и в сообщениях, отправленных до рестарта
+        self.bot.add_view(TechTicketView())
+
+    async def cog_unload(self):
+        # Останавливаем таймер (текущий сброс дорабатывает) и сбрасываем всё, что осталось в памяти
+        self.flush_voice_sessions.stop()
+        self.verify_counters.cancel()
+        await self.voice_sessions.flush()
 
     @commands.Cog.listener()
     async def on_voice_state_update(self, member: discord.Member, before, after):
@@ -61,63 +112,103 @@ class Stats(commands.Cog):
         if member.bot:
             return
 
-        conn = sqlite3.connect("greenfild.db")
-        c = conn.cursor()
+        # Индекс присутствия обновляем при любом переходе, включая AFK и смену канала
+        if before.channel != after.channel:
+            presence.move(member.guild.id, member.id, after.channel.id if after.channel else None)
+
+        key = (member.id, member.guild.id)
+        was_tracked = is_tracked_channel(before.channel)
+        is_tracked = is_tracked_channel(after.channel)
+
+        # Покинул голосовой канал (или ушёл в AFK)
+        if was_tracked and not is_tracked:
+            self.voice_sessions.leave(key, int(time.time()))
+
+        # Вошёл в голосовой канал (или вернулся из AFK)
+        elif is_tracked and not was_tracked:
+            self.voice_sessions.join(key, int(time.time()))
+
+        # Переход между обычными каналами — сессия продолжается
+
+        # Буфер переполнен — сбрасываем, не дожидаясь таймера
+        if self.voice_sessions.overflowing:
+            await self.voice_sessions.flush()
+
+    async def reconcile_voice_sessions(self):
+        """Сверяет сессии с текущим составом голосовых каналов всех серверов"""
+        presence.seed(self.bot.guilds)
+        live = {
+            (member.id, guild.id)
+            for guild in self.bot.guilds
+            for vc in guild.voice_channels
+            if is_tracked_channel(vc)
+            for member in vc.members
+            if not member.bot
+        }
+        try:
+            await self.voice_sessions.reconcile(live, int(time.time()))
+            print(f"🔊 Голосовые сессии сверены: {len(live)} участников в голосе")
+        except Exception as e:
+            print(f"❌ Ошибка сверки голосовых сессий: {e}")
 
-        # Покинул голосовой канал
-        if before.channel is not None and after.channel is None:
-            c.execute(
-                "SELECT last_join FROM online_time WHERE user_id = ? AND guild_id = ?",
-                (member.id, member.guild.id)
-            )
-            row = c.fetchone()
-            if row and row[0]:
-                total_time = int(time.time()) - row[0]
-                c.execute(
-                    "UPDATE online_time SET total_seconds = total_seconds + ? WHERE user_id = ? AND guild_id = ?",
-                    (total_time, member.id, member.guild.id)
-                )
-
-        # Вошёл в голосовой канал
-        elif before.channel is None and after.channel is not None:
-            c.execute(
-                "INSERT OR REPLACE INTO online_time (user_id, guild_id, last_join, total_seconds) VALUES (?, ?, ?, COALESCE((SELECT total_seconds FROM online_time WHERE user_id = ? AND guild_id = ?), 0))",
-                (member.id, member.guild.id, int(time.time()), member.id, member.guild.id)
-            )
+    @commands.Cog.listener()
+    async def on_ready(self):
+        await self.reconcile_voice_sessions()
 
-        conn.commit()
-        conn.close()
+    @commands.Cog.listener()
+    async def on_resumed(self):
+        await self.reconcile_voice_sessions()
 
-    @discord.app_command.command(name="статистика", description="Показать статистику сервера")
-    async def stats(self, interaction: discord.Interaction):
-        conn = sqlite3.connect("greenfild.db")
-        c = conn.cursor()
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel):
+        # Канал заявки удалили вручную — заявка закрыта
+        ticket = tickets.get(channel.id)
+        if ticket is not None:
+            await tickets.close(ticket)
 
-        # Глобальные баны
-        c.execute("SELECT COUNT(*) FROM global_bans")
-        ban_count = c.fetchone()[0] or 0
+    @commands.Cog.listener()
+    async def on_disconnect(self):
+        # Пока нет связи с Discord, heartbeat не продвигается
+        self.voice_sessions.synced = False
+
+    @tasks.loop(seconds=5)
+    async def flush_voice_sessions(self):
+        """Пакетно сбрасывает голосовые сессии в online_time"""
+        try:
+            await self.voice_sessions.flush()
+        except Exception as e:
+            print(f"❌ Ошибка сброса голосовой статистики: {e}")
+
+    @tasks.loop(hours=1)
+    async def verify_counters(self):
+        """Сверяет счётчики статистики с реальными данными в таблицах"""
+        # Первый проход — сразу после старта, счётчики только что загружены
+        if self.verify_counters.current_loop == 0:
+            return
+        try:
+            if await counters.refresh():
+                print("⚠️ Счётчики статистики расходились с БД — пересчитаны")
+        except Exception as e:
+            print(f"❌ Ошибка сверки счётчиков: {e}")
 
-        # Активные варны
-        c.execute("SELECT COUNT(*) FROM warns WHERE expires_at > ?", (int(time.time()),))
-        warn_count = c.fetchone()[0] or 0
+    @verify_counters.before_loop
+    async def before_verify_counters(self):
+        await self.bot.wait_until_ready()
 
-        # Назначения
-        c.execute("SELECT COUNT(*) FROM assignment_logs")
-        assign_count = c.fetchone()[0] or 0
+    @discord.app_commands.command(name="статистика", description="Показать статистику сервера")
+    async def stats(self, interaction: discord.Interaction):
+        # Глобальные баны, активные варны, назначения — из счётчиков в памяти
+        ban_count = counters.global_bans
+        warn_count = counters.warns
+        assign_count = counters.assignments
 
         # Онлайн в голосовых
-        voice_members = set()
-        for vc in interaction.guild.voice_channels:
-            voice_members.update(vc.members)
-        online_count = len([m for m in voice_members if not m.bot])
+        online_count = presence.guild_count(interaction.guild.id)
 
         # Общий онлайн (часы)
-        c.execute("SELECT SUM(total_seconds) FROM online_time WHERE guild_id = ?", (interaction.guild.id,))
-        total_seconds = c.fetchone()[0] or 0
+        total_seconds = counters.voice_seconds.get(interaction.guild.id, 0)
         hours = total_seconds // 3600
 
-        conn.close()
-
         embed = discord.Embed(
             title="📊 Статистика Greenfild Project",
             color=0x3498db,
@@ -133,7 +224,21 @@ class Stats(commands.Cog):
 
         await interaction.response.send_message(embed=embed)
 
-    @discord.app_command.command(name="техзаявка", description="Создать заявку в техподдержку")
+    @discord.app_commands.command(name="топ_онлайн", description="Топ по времени в голосовых каналах")
+    async def voice_top(self, interaction: discord.Interaction, проект: bool = False):
+        """Топ сервера (или всего проекта) по голосовому онлайну, с учётом текущих сессий"""
+        title = "🏆 Топ онлайна Greenfild Project" if проект else f"🏆 Топ онлайна — {interaction.guild.name}"
+        guild_id = None if проект else interaction.guild.id
+        view = KeysetPageView(
+            lambda cursor, size: self.leaderboard.page(guild_id, cursor, size),
+            lambda row: (row[1], row[0]),
+            lambda rows, page: leaderboard_embed(title, rows, page),
+            PAGE_SIZE
+        )
+        await view.load()
+        await interaction.response.send_message(embed=view.embed(), view=view)
+
+    @discord.app_commands.command(name="техзаявка", description="Создать заявку в техподдержку")
     async def tech_ticket(self, interaction: discord.Interaction):
         tech_role_id = get_role_id("tech_support")
         if not tech_role_id:
@@ -151,45 +256,85 @@ class Stats(commands.Cog):
             )
             return
 
-        # Создаём категорию, если нет
-        category = discord.utils.get(interaction.guild.categories, name="🔧 Техподдержка")
-        if not category:
-            category = await interaction.guild.create_category("🔧 Техподдержка")
+        key = (interaction.guild.id, interaction.user.id)
+        limit = settings.tech_support_max_open_tickets
+        if tickets.open_count(*key) + self._tickets_in_progress.get(key, 0) >= limit:
+            await interaction.response.send_message(
+                f"❌ У вас уже есть открытая заявка (максимум {limit}). Дождитесь ответа в ней.",
+                ephemeral=True
+            )
+            return
+
+        # Место занято сразу, до первого await — повторный клик не пройдёт проверку лимита
+        self._tickets_in_progress[key] = self._tickets_in_progress.get(key, 0) + 1
+        try:
+            # Создание категории и канала — несколько запросов к API, отвечаем сразу
+            await interaction.response.defer(ephemeral=True, thinking=True)
+            channel = await self.create_ticket_channel(interaction.guild, interaction.user, tech_role)
+        except Exception as e:
+            # При любой ошибке отвечаем, чтобы у пользователя не осталось «думает…»; место освобождает finally
+            reason = (e.text or str(e)) if isinstance(e, discord.HTTPException) else "внутренняя ошибка бота"
+            if interaction.response.is_done():
+                try:
+                    await interaction.edit_original_response(content=f"❌ Не удалось создать заявку: {reason}")
+                except discord.HTTPException:
+                    pass
+            if not isinstance(e, discord.HTTPException):
+                # Неожиданная ошибка — дальше в обработчик ошибок дерева команд (лог с трейсбеком)
+                raise
+            return
+        finally:
+            self._tickets_in_progress[key] -= 1
+            if not self._tickets_in_progress[key]:
+                del self._tickets_in_progress[key]
+
+        await interaction.edit_original_response(content=f"✅ Канал создан: {channel.mention}")
+
+    async def ticket_category(self, guild: discord.Guild) -> discord.CategoryChannel:
+        """Категория заявок сервера: из кэша, иначе поиск/создание под замком сервера (без дублей)"""
+        name = settings.tech_support_category
+        category = guild.get_channel(self._ticket_categories.get(guild.id, 0))
+        if category is not None and category.name == name:
+            return category
+
+        lock = self._category_locks.setdefault(guild.id, asyncio.Lock())
+        async with lock:
+            # Пока ждали замок, категорию мог создать соседний вызов
+            category = guild.get_channel(self._ticket_categories.get(guild.id, 0))
+            if category is None or category.name != name:
+                category = discord.utils.get(guild.categories, name=name) or await guild.create_category(name)
+                self._ticket_categories[guild.id] = category.id
+        return category
+
+    async def create_ticket_channel(self, guild: discord.Guild, user: discord.Member, tech_role: discord.Role) -> discord.TextChannel:
+        category = await self.ticket_category(guild)
 
         # Права канала
         overwrites = {
-            interaction.guild.default_role: discord.PermissionOverwrite(read_messages=False),
-            interaction.user: discord.PermissionOverwrite(read_messages=True, send_messages=True),
+            guild.default_role: discord.PermissionOverwrite(read_messages=False),
+            user: discord.PermissionOverwrite(read_messages=True, send_messages=True),
             tech_role: discord.PermissionOverwrite(read_messages=True, send_messages=True),
-            interaction.guild.me: discord.PermissionOverwrite(read_messages=True, send_messages=True)
+            guild.me: discord.PermissionOverwrite(read_messages=True, send_messages=True)
         }
 
         # Создаём канал
-        channel = await interaction.guild.create_text_channel(
-            name=f"тех-{interaction.user.name}",
+        channel = await guild.create_text_channel(
+            name=f"тех-{user.name}",
             category=category,
             overwrites=overwrites
         )
 
-        # Сохраняем в БД
-        conn = sqlite3.connect("greenfild.db")
-        c = conn.cursor()
-        c.execute(
-            "INSERT INTO tech_tickets (user_id, guild_id, channel_id) VALUES (?, ?, ?)",
-            (interaction.user.id, interaction.guild.id, channel.id)
-        )
-        conn.commit()
-        conn.close()
+        # Сохраняем в БД и индекс
+        await tickets.create(user.id, guild.id, channel.id)
 
         # Отправляем сообщение
         embed = discord.Embed(
             title="📩 Новая заявка в техподдержку",
-            description=f"Пользователь: {interaction.user.mention}\nОпишите вашу проблему.",
+            description=f"Пользователь: {user.mention}\nОпишите вашу проблему.",
             color=0x3498db
         )
-        view = TechTicketView(channel.id)
-        await channel.send(embed=embed, view=view)
-        await interaction.response.send_message(f"✅ Канал создан: {channel.mention}", ephemeral=True)
+        await channel.send(embed=embed, view=TechTicketView())
+        return channel
 
 
 async def setup(bot: commands.Bot):
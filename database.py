@@ -1,67 +1,473 @@
 import sqlite3
 import os
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 
-def init_db():
-    """Инициализирует базу данных и создаёт все таблицы, если их нет"""
-    # Убедимся, что папка существует (на случай, если запуск из другой директории)
-    db_path = "greenfild.db"
+DB_PATH = "greenfild.db"
 
-    conn = sqlite3.connect(db_path)
-    c = conn.cursor()
 
-    # Таблица: роли проекта (хранит ID ролей по ключам)
-    c.execute('''CREATE TABLE IF NOT EXISTS project_roles (
-        role_name TEXT PRIMARY KEY,
-        role_id INTEGER
-    )''')
+def _open_connection(path: str) -> sqlite3.Connection:
+    """Открывает соединение в режиме WAL (autocommit, транзакции — явные)"""
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+    return conn
 
-    # Таблица: логи назначений (админы, лидеры, медиа)
-    c.execute('''CREATE TABLE IF NOT EXISTS assignment_logs (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        assigner_id INTEGER NOT NULL,      -- кто назначил
-        assigned_id INTEGER NOT NULL,      -- кого назначили
-        role_type TEXT NOT NULL,           -- 'admin', 'leader', 'movie'
-        reason TEXT NOT NULL,              -- причина назначения
-        timestamp INTEGER DEFAULT (strftime('%s', 'now'))
-    )''')
 
-    # Таблица: глобальные баны (работает на всех серверах проекта)
-    c.execute('''CREATE TABLE IF NOT EXISTS global_bans (
-        user_id INTEGER PRIMARY KEY,
-        reason TEXT NOT NULL,
-        banned_by INTEGER NOT NULL,
-        expires_at INTEGER                  -- NULL = навсегда, иначе timestamp
-    )''')
+class Transaction:
+    """
+    Открытая транзакция на соединении писателя.
+    Все запросы выполняются в потоке писателя, коммит — при выходе из блока.
+    """
 
-    # Таблица: предупреждения (warns)
-    c.execute('''CREATE TABLE IF NOT EXISTS warns (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER NOT NULL,
-        guild_id INTEGER NOT NULL,
-        moderator_id INTEGER NOT NULL,
-        reason TEXT NOT NULL,
-        expires_at INTEGER NOT NULL         -- автоматически снимается через N дней
-    )''')
+    def __init__(self, db: "Database"):
+        self._db = db
+
+    async def execute(self, sql: str, params=()) -> sqlite3.Cursor:
+        return await self._db._in_writer(lambda conn: conn.execute(sql, params), sql)
+
+    async def executemany(self, sql: str, seq) -> int:
+        return await self._db._in_writer(lambda conn: conn.executemany(sql, seq).rowcount, sql)
+
+    async def fetchone(self, sql: str, params=()):
+        return await self._db._in_writer(lambda conn: conn.execute(sql, params).fetchone(), sql)
+
+    async def fetchall(self, sql: str, params=()) -> list:
+        return await self._db._in_writer(lambda conn: conn.execute(sql, params).fetchall(), sql)
+
+
+class Database:
+    """
+    Общий асинхронный слой доступа к SQLite для всего процесса.
+
+    - один долгоживущий поток-писатель со своим соединением (все записи идут через него);
+    - небольшой пул потоков-читателей, у каждого своё соединение (WAL позволяет читать параллельно с записью);
+    - event loop никогда не ждёт диск напрямую.
+    """
+
+    def __init__(self, path: str = DB_PATH, readers: int = 2):
+        self.path = path
+        self.readers = readers
+        self._writer: ThreadPoolExecutor | None = None
+        self._reader_pool: ThreadPoolExecutor | None = None
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._conn_lock = threading.Lock()
+        self._write_lock = asyncio.Lock()
+        # Хук метрик: on_query(kind, sql, seconds); None — без замеров
+        self.on_query = None
+
+    # === Жизненный цикл ===
+    def open(self):
+        """Создаёт пулы потоков (соединения открываются лениво в своих потоках)"""
+        if self._writer is not None:
+            return
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+        self._reader_pool = ThreadPoolExecutor(max_workers=self.readers, thread_name_prefix="db-reader")
+
+    async def close(self):
+        """Дожидается завершения запросов и закрывает все соединения"""
+        if self._writer is None:
+            return
+        writer, readers = self._writer, self._reader_pool
+        self._writer = self._reader_pool = None
+        await asyncio.to_thread(writer.shutdown, True)
+        await asyncio.to_thread(readers.shutdown, True)
+        with self._conn_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    def _thread_connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = _open_connection(self.path)
+            self._local.conn = conn
+            with self._conn_lock:
+                self._connections.append(conn)
+        return conn
+
+    async def _run(self, executor: ThreadPoolExecutor, fn, kind: str, sql: str | None):
+        loop = asyncio.get_running_loop()
+        if self.on_query is None or sql is None:
+            return await loop.run_in_executor(executor, lambda: fn(self._thread_connection()))
+        # Время с учётом ожидания в очереди потока — именно его видит обработчик
+        t0 = time.perf_counter()
+        try:
+            return await loop.run_in_executor(executor, lambda: fn(self._thread_connection()))
+        finally:
+            self.on_query(kind, sql, time.perf_counter() - t0)
+
+    async def _in_writer(self, fn, sql: str | None = None):
+        self.open()
+        return await self._run(self._writer, fn, "write", sql)
+
+    async def _in_reader(self, fn, sql: str | None = None):
+        self.open()
+        return await self._run(self._reader_pool, fn, "read", sql)
+
+    # === Запись ===
+    async def execute(self, sql: str, params=()) -> sqlite3.Cursor:
+        """Выполняет один пишущий запрос (автокоммит)"""
+        async with self._write_lock:
+            return await self._in_writer(lambda conn: conn.execute(sql, params), sql)
+
+    async def executemany(self, sql: str, seq) -> int:
+        """Выполняет пакет запросов одной транзакцией, возвращает rowcount"""
+        async with self.transaction() as tx:
+            return await tx.executemany(sql, seq)
+
+    async def executescript(self, sql: str):
+        """Выполняет SQL до конца через sqlite3_exec (PRAGMA incremental_vacuum освобождает по странице на шаг)"""
+        async with self._write_lock:
+            await self._in_writer(lambda conn: conn.executescript(sql), sql)
+
+    @asynccontextmanager
+    async def transaction(self):
+        """
+        async with db.transaction() as tx:
+            await tx.execute(...)
+        Коммит при успешном выходе, откат при исключении.
+        """
+        async with self._write_lock:
+            try:
+                await self._in_writer(lambda conn: conn.execute("BEGIN IMMEDIATE"))
+            except BaseException:
+                # Отменили, пока BEGIN ждал в очереди: он всё равно выполнится — откатываем следом
+                await self._in_writer(lambda conn: conn.in_transaction and conn.execute("ROLLBACK"))
+                raise
+            try:
+                yield Transaction(self)
+            except BaseException:
+                await self._in_writer(lambda conn: conn.execute("ROLLBACK"))
+                raise
+            else:
+                await self._in_writer(lambda conn: conn.execute("COMMIT"))
+
+    async def run_in_transaction(self, fn):
+        """Выполняет синхронную функцию fn(conn) в потоке писателя одной транзакцией"""
+        def wrapped(conn: sqlite3.Connection):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(conn)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            return result
+
+        async with self._write_lock:
+            return await self._in_writer(wrapped, f"TRANSACTION {getattr(fn, '__name__', 'fn')}")
+
+    # === Чтение ===
+    async def fetchone(self, sql: str, params=()):
+        return await self._in_reader(lambda conn: conn.execute(sql, params).fetchone(), sql)
+
+    async def fetchall(self, sql: str, params=()) -> list:
+        return await self._in_reader(lambda conn: conn.execute(sql, params).fetchall(), sql)
+
+    async def fetchval(self, sql: str, params=(), default=None):
+        """Возвращает первое поле первой строки (или default)"""
+        row = await self.fetchone(sql, params)
+        return row[0] if row and row[0] is not None else default
 
-    # Таблица: онлайн-статистика (время в голосовых каналах)
-    c.execute('''CREATE TABLE IF NOT EXISTS online_time (
-        user_id INTEGER,
-        guild_id INTEGER,
-        last_join INTEGER,                 -- когда зашёл в голосовой канал
-        total_seconds INTEGER DEFAULT 0,   -- общее время в секундах
-        PRIMARY KEY (user_id, guild_id)
-    )''')
 
-    # Таблица: техподдержка (тикеты)
-    c.execute('''CREATE TABLE IF NOT EXISTS tech_tickets (
-        ticket_id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER NOT NULL,
-        guild_id INTEGER NOT NULL,
-        channel_id INTEGER NOT NULL,
-        status TEXT DEFAULT 'open',        -- 'open' или 'closed'
-        created_at INTEGER DEFAULT (strftime('%s', 'now'))
+# Все модули пишут через этот экземпляр: второй Database завёл бы своего писателя
+# и его транзакции конкурировали бы за блокировку файла с транзакциями первого
+db = Database(DB_PATH)
+
+
+# === Миграции схемы ===
+# Каждый шаг — (версия, описание, [SQL]). Шаги применяются по порядку, каждый в своей транзакции,
+# номер применённой версии хранится в schema_version. Новые изменения схемы — только новым шагом в конце.
+MIGRATIONS = [
+    (1, "базовая схема", [
+        # Таблица: роли проекта (хранит ID ролей по ключам)
+        '''CREATE TABLE IF NOT EXISTS project_roles (
+            role_name TEXT PRIMARY KEY,
+            role_id INTEGER
+        )''',
+
+        # Таблица: логи назначений (админы, лидеры, медиа)
+        '''CREATE TABLE IF NOT EXISTS assignment_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            assigner_id INTEGER NOT NULL,      -- кто назначил
+            assigned_id INTEGER NOT NULL,      -- кого назначили
+            role_type TEXT NOT NULL,           -- 'admin', 'leader', 'movie'
+            reason TEXT NOT NULL,              -- причина назначения
+            timestamp INTEGER DEFAULT (strftime('%s', 'now'))
+        )''',
+
+        # Таблица: глобальные баны (работает на всех серверах проекта)
+        '''CREATE TABLE IF NOT EXISTS global_bans (
+            user_id INTEGER PRIMARY KEY,
+            reason TEXT NOT NULL,
+            banned_by INTEGER NOT NULL,
+            expires_at INTEGER                  -- NULL = навсегда, иначе timestamp
+        )''',
+
+        # Таблица: предупреждения (warns)
+        '''CREATE TABLE IF NOT EXISTS warns (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            guild_id INTEGER NOT NULL,
+            moderator_id INTEGER NOT NULL,
+            reason TEXT NOT NULL,
+            expires_at INTEGER NOT NULL         -- автоматически снимается через N дней
+        )''',
+
+        # Таблица: онлайн-статистика (время в голосовых каналах)
+        '''CREATE TABLE IF NOT EXISTS online_time (
+            user_id INTEGER,
+            guild_id INTEGER,
+            last_join INTEGER,                 -- когда зашёл в голосовой канал
+            total_seconds INTEGER DEFAULT 0,   -- общее время в секундах
+            PRIMARY KEY (user_id, guild_id)
+        )''',
+
+        # Таблица: техподдержка (тикеты)
+        '''CREATE TABLE IF NOT EXISTS tech_tickets (
+            ticket_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            guild_id INTEGER NOT NULL,
+            channel_id INTEGER NOT NULL,
+            status TEXT DEFAULT 'open',        -- 'open' или 'closed'
+            created_at INTEGER DEFAULT (strftime('%s', 'now'))
+        )''',
+
+        # Таблица: служебные значения бота (heartbeat голосовой статистики и т.п.)
+        '''CREATE TABLE IF NOT EXISTS bot_meta (
+            key TEXT PRIMARY KEY,
+            value INTEGER
+        )''',
+    ]),
+    (2, "индексы для горячих запросов", [
+        # /варн (COUNT активных) и /варны (список) — покрывающий индекс
+        "CREATE INDEX IF NOT EXISTS idx_warns_user_guild_expires ON warns (user_id, guild_id, expires_at, reason)",
+        # Снятие истёкших варнов и подсчёт активных в /статистика
+        "CREATE INDEX IF NOT EXISTS idx_warns_expires ON warns (expires_at)",
+        # Кнопки тикета: поиск автора по каналу
+        "CREATE INDEX IF NOT EXISTS idx_tech_tickets_channel ON tech_tickets (channel_id, user_id)",
+        # Последние назначения
+        "CREATE INDEX IF NOT EXISTS idx_assignment_logs_timestamp ON assignment_logs (timestamp)",
+        # Открытые голосовые сессии (сверка при старте)
+        "CREATE INDEX IF NOT EXISTS idx_online_time_open ON online_time (last_join) WHERE last_join IS NOT NULL",
+    ]),
+    (3, "индекс для топа по онлайну", [
+        # Топ сервера по голосовому времени с keyset-пагинацией по (total_seconds, user_id)
+        "CREATE INDEX IF NOT EXISTS idx_online_time_guild_total ON online_time (guild_id, total_seconds DESC, user_id DESC)",
+    ]),
+    (4, "индексы для фильтров истории назначений", [
+        # Keyset-пагинация по (timestamp, id) с фильтром по кто назначил / кого / тип роли
+        "CREATE INDEX IF NOT EXISTS idx_assignment_logs_assigner ON assignment_logs (assigner_id, timestamp, id)",
+        "CREATE INDEX IF NOT EXISTS idx_assignment_logs_assigned ON assignment_logs (assigned_id, timestamp, id)",
+        "CREATE INDEX IF NOT EXISTS idx_assignment_logs_role_type ON assignment_logs (role_type, timestamp, id)",
+    ]),
+    (5, "журнал репликации глобальных банов", [
+        # Журнал изменений global_bans: пишется в той же транзакции, что и сама таблица.
+        # seq только растёт — другие инстансы бота забирают записи после своего курсора
+        '''CREATE TABLE IF NOT EXISTS ban_journal (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            action TEXT NOT NULL,              -- 'ban' или 'unban'
+            user_id INTEGER NOT NULL,
+            reason TEXT,
+            banned_by INTEGER,
+            expires_at INTEGER,
+            origin TEXT,                       -- инстанс, где бан выдан (NULL — этот)
+            created_at INTEGER DEFAULT (strftime('%s', 'now'))
+        )''',
+        # Последняя применённая запись журнала каждого инстанса-источника
+        '''CREATE TABLE IF NOT EXISTS replication_cursors (
+            peer TEXT PRIMARY KEY,
+            last_seq INTEGER NOT NULL,
+            updated_at INTEGER NOT NULL
+        )''',
+        # Уже существующие баны — первыми записями, чтобы новый инстанс получил их с курсора 0
+        '''INSERT INTO ban_journal (action, user_id, reason, banned_by, expires_at)
+           SELECT 'ban', user_id, reason, banned_by, expires_at FROM global_bans''',
+    ]),
+    (6, "статусы и время заявок техподдержки", [
+        # status: 'open' → 'accepted' → 'closed'
+        "ALTER TABLE tech_tickets ADD COLUMN accepted_by INTEGER",
+        "ALTER TABLE tech_tickets ADD COLUMN accepted_at INTEGER",
+        "ALTER TABLE tech_tickets ADD COLUMN closed_at INTEGER",
+        # Загрузка незакрытых заявок в индекс при старте
+        "CREATE INDEX IF NOT EXISTS idx_tech_tickets_active ON tech_tickets (guild_id) WHERE status != 'closed'",
+    ]),
+    (7, "временные баны на сервере (эскалация варнов)", [
+        '''CREATE TABLE IF NOT EXISTS temp_bans (
+            guild_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            expires_at INTEGER NOT NULL,
+            PRIMARY KEY (guild_id, user_id)
+        )''',
+    ]),
+    (8, "индекс закрытых заявок для архивации", [
+        # Заявки, закрытые до миграции 6, получают closed_at = created_at: архивация идёт по closed_at
+        "UPDATE tech_tickets SET closed_at = created_at WHERE status = 'closed' AND closed_at IS NULL",
+        "CREATE INDEX IF NOT EXISTS idx_tech_tickets_closed ON tech_tickets (closed_at) WHERE status = 'closed'",
+    ]),
+    (9, "удаление неиспользуемых индексов", [
+        # /варн, /варны и кнопки тикетов читают из памяти (utils/warns.py, utils/tickets.py) —
+        # индексы миграции 2 под эти запросы только замедляют вставки
+        "DROP INDEX IF EXISTS idx_warns_user_guild_expires",
+        "DROP INDEX IF EXISTS idx_tech_tickets_channel",
+    ]),
+]
+
+# Горячие запросы и индекс, который обязан быть в их плане (проверка через EXPLAIN QUERY PLAN)
+HOT_QUERY_PLANS = [
+    # Пересчёт счётчика активных варнов (utils/counters.py)
+    ("SELECT COUNT(*) FROM warns WHERE expires_at > ?", (0,),
+     "idx_warns_expires"),
+    # Порции архивации (utils/retention.py)
+    ("SELECT id, user_id, guild_id, moderator_id, reason, expires_at, expires_at FROM warns "
+     "WHERE 1 AND expires_at < ? LIMIT ?", (0, 500),
+     "idx_warns_expires"),
+    ("SELECT id, assigner_id, assigned_id, role_type, reason, timestamp, timestamp FROM assignment_logs "
+     "WHERE 1 AND timestamp < ? LIMIT ?", (0, 500),
+     "idx_assignment_logs_timestamp"),
+    ("SELECT ticket_id, user_id, guild_id, channel_id, status, created_at, accepted_by, accepted_at, closed_at, closed_at "
+     "FROM tech_tickets WHERE status = 'closed' AND closed_at < ? LIMIT ?", (0, 500),
+     "idx_tech_tickets_closed"),
+    # Сверка голосовых сессий при старте (utils/voice.py)
+    ("SELECT guild_id, SUM(MAX(COALESCE(?, last_join) - last_join, 0)) FROM online_time "
+     "INDEXED BY idx_online_time_open WHERE last_join IS NOT NULL AND 1 GROUP BY guild_id", (0,),
+     "idx_online_time_open"),
+    ("UPDATE online_time SET last_join = NULL WHERE last_join IS NOT NULL", (),
+     "idx_online_time_open"),
+    # История назначений: первая страница и keyset-пагинация с фильтрами (cogs/assignment.py)
+    ("SELECT id, assigner_id, assigned_id, role_type, reason, timestamp FROM assignment_logs "
+     "ORDER BY timestamp DESC, id DESC LIMIT ?", (10,),
+     "idx_assignment_logs_timestamp"),
+    ("SELECT id FROM assignment_logs WHERE (timestamp, id) < (?, ?) ORDER BY timestamp DESC, id DESC LIMIT ?", (0, 0, 10),
+     "idx_assignment_logs_timestamp"),
+    ("SELECT id FROM assignment_logs WHERE assigner_id = ? AND (timestamp, id) < (?, ?) "
+     "ORDER BY timestamp DESC, id DESC LIMIT ?", (0, 0, 0, 10),
+     "idx_assignment_logs_assigner"),
+    ("SELECT id FROM assignment_logs WHERE assigned_id = ? AND (timestamp, id) < (?, ?) "
+     "ORDER BY timestamp DESC, id DESC LIMIT ?", (0, 0, 0, 10),
+     "idx_assignment_logs_assigned"),
+    ("SELECT id FROM assignment_logs WHERE role_type = ? AND (timestamp, id) < (?, ?) "
+     "ORDER BY timestamp DESC, id DESC LIMIT ?", ("admin", 0, 0, 10),
+     "idx_assignment_logs_role_type"),
+    # Топ по онлайну (utils/leaderboard.py)
+    ("SELECT user_id, total_seconds FROM online_time WHERE guild_id = ? AND (total_seconds, user_id) < (?, ?) "
+     "ORDER BY total_seconds DESC, user_id DESC LIMIT ?", (0, 0, 0, 10),
+     "idx_online_time_guild_total"),
+    # Загрузка незакрытых заявок (utils/tickets.py)
+    ("SELECT ticket_id, user_id, guild_id, channel_id, status, created_at, accepted_by FROM tech_tickets "
+     "WHERE status != 'closed'", (),
+     "idx_tech_tickets_active"),
+    # Журнал банов после курсора (utils/bans.py)
+    ("SELECT seq, action, user_id, reason, banned_by, expires_at, origin FROM ban_journal "
+     "WHERE seq > ? ORDER BY seq LIMIT ?", (0, 500),
+     "INTEGER PRIMARY KEY"),
+]
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    conn.execute('''CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        description TEXT NOT NULL,
+        applied_at INTEGER DEFAULT (strftime('%s', 'now'))
     )''')
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Применяет недостающие миграции, возвращает итоговую версию схемы"""
+    current = schema_version(conn)
+    for version, description, statements in MIGRATIONS:
+        if version <= current:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for sql in statements:
+                conn.execute(sql)
+            conn.execute(
+                "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                (version, description)
+            )
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        current = version
+        print(f"🧱 Миграция {version}: {description}")
+    return current
+
+
+def check_query_plans(conn: sqlite3.Connection) -> list[str]:
+    """Возвращает горячие запросы, которые не используют ожидаемый индекс"""
+    problems = []
+    for sql, params, index in HOT_QUERY_PLANS:
+        plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+        if not any(index in row[-1] for row in plan):
+            problems.append(f"{sql} → {'; '.join(row[-1] for row in plan)}")
+    return problems
+
+
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+def enable_incremental_vacuum(db_path: str = DB_PATH):
+    """Однократно переводит существующую базу в auto_vacuum=INCREMENTAL (полный VACUUM, переписывает файл)"""
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == AUTO_VACUUM_INCREMENTAL:
+            print("✅ auto_vacuum=INCREMENTAL уже включён")
+            return
+        size = os.path.getsize(db_path)
+        print(f"🧹 VACUUM '{db_path}' ({size / 1024 / 1024:.1f} МБ) — может занять время...")
+        started = time.monotonic()
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("VACUUM")
+        print(f"✅ auto_vacuum=INCREMENTAL включён за {time.monotonic() - started:.1f} с, "
+              f"размер {os.path.getsize(db_path) / 1024 / 1024:.1f} МБ")
+    finally:
+        conn.close()
+
+
+def init_db():
+    """Инициализирует базу данных: WAL и все недостающие миграции схемы"""
+    db_path = DB_PATH
+
+    conn = sqlite3.connect(db_path, isolation_level=None)
+
+    # Свободные страницы возвращает фоновая архивация (PRAGMA incremental_vacuum, utils/retention.py).
+    # Новой базе режим ставится сразу (до WAL — после записи заголовка файла он уже не применится);
+    # существующую переводит только полный VACUUM, поэтому это отдельный ручной шаг
+    if conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()[0] == 0:
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    elif conn.execute("PRAGMA auto_vacuum").fetchone()[0] != AUTO_VACUUM_INCREMENTAL:
+        print("ℹ️ auto_vacuum выключен: место после архивации не возвращается файлу. "
+              "Включить (бот остановлен, файл переписывается целиком): python database.py --incremental-vacuum")
+
+    # WAL сохраняется в файле БД — читатели не блокируют писателя
+    conn.execute("PRAGMA journal_mode=WAL")
+
+    version = migrate(conn)
+    for problem in check_query_plans(conn):
+        print(f"⚠️ Запрос не использует индекс: {problem}")
 
-    conn.commit()
     conn.close()
-    print(f"💾 База данных '{db_path}' готова.")
+    print(f"💾 База данных '{db_path}' готова (схема v{version}).")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Обслуживание базы Greenfild Bot")
+    parser.add_argument("--incremental-vacuum", action="store_true",
+                        help="однократно включить auto_vacuum=INCREMENTAL (полный VACUUM; бот должен быть остановлен)")
+    args = parser.parse_args()
+    if args.incremental_vacuum:
+        enable_incremental_vacuum()
+    else:
+        parser.print_help()
@@ -0,0 +1,100 @@
+"""
+Запуск бота несколькими процессами: каждый обслуживает свой диапазон шардов.
+
+    python launcher.py --processes 4               # число шардов подскажет Discord
+    python launcher.py --processes 4 --shards 16
+
+Лаунчер один раз готовит БД (миграции), поднимает хаб кластера (utils/cluster.py)
+и запускает main.py с SHARD_COUNT / SHARD_IDS / CLUSTER_NAME / CLUSTER_ADDRESS.
+Упавший процесс перезапускается через RESTART_DELAY секунд.
+Все процессы работают с одной базой SQLite (WAL): запись сериализует сама SQLite,
+кэши (баны, роли, счётчики) и рассылка банов синхронизируются через хаб.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import aiohttp
+from dotenv import load_dotenv
+from database import init_db
+from utils.cluster import ClusterHub
+
+HUB_HOST = "127.0.0.1"
+RESTART_DELAY = 5
+
+
+async def recommended_shards(token: str) -> int:
+    """Число шардов, которое рекомендует Discord для этого бота"""
+    async with aiohttp.ClientSession() as session:
+        async with session.get(
+            "https://discord.com/api/v10/gateway/bot",
+            headers={"Authorization": f"Bot {token}"}
+        ) as response:
+            response.raise_for_status()
+            return (await response.json())["shards"]
+
+
+def split_shards(shard_count: int, processes: int) -> list[list[int]]:
+    """Непрерывные диапазоны шардов примерно равного размера"""
+    size, extra = divmod(shard_count, processes)
+    ranges, start = [], 0
+    for i in range(processes):
+        end = start + size + (1 if i < extra else 0)
+        if end > start:
+            ranges.append(list(range(start, end)))
+        start = end
+    return ranges
+
+
+async def run_process(name: str, shard_ids: list[int], shard_count: int, hub_port: int):
+    env = dict(
+        os.environ,
+        SHARD_COUNT=str(shard_count),
+        SHARD_IDS=f"{shard_ids[0]}-{shard_ids[-1]}",
+        CLUSTER_NAME=name,
+        CLUSTER_ADDRESS=f"{HUB_HOST}:{hub_port}",
+    )
+    while True:
+        print(f"🚀 Процесс {name}: шарды {shard_ids[0]}–{shard_ids[-1]} из {shard_count}")
+        process = await asyncio.create_subprocess_exec(sys.executable, "main.py", env=env)
+        try:
+            code = await process.wait()
+        except asyncio.CancelledError:
+            process.terminate()
+            await process.wait()
+            raise
+        print(f"⚠️ Процесс {name} завершился с кодом {code}, перезапуск через {RESTART_DELAY} с")
+        await asyncio.sleep(RESTART_DELAY)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Greenfild Bot: несколько процессов с диапазонами шардов")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--shards", type=int, help="всего шардов (по умолчанию — рекомендация Discord)")
+    parser.add_argument("--hub-port", type=int, default=int(os.getenv("CLUSTER_HUB_PORT", "8765")))
+    args = parser.parse_args()
+
+    # Миграции — один раз до старта процессов, чтобы они не применялись параллельно
+    init_db()
+
+    shard_count = args.shards or await recommended_shards(os.getenv("DISCORD_TOKEN"))
+    ranges = split_shards(shard_count, max(args.processes, 1))
+
+    server = await ClusterHub().serve(HUB_HOST, args.hub_port)
+    print(f"🔗 Хаб кластера: {HUB_HOST}:{args.hub_port}, процессов: {len(ranges)}, шардов: {shard_count}")
+    async with server:
+        await asyncio.gather(*(
+            run_process(f"{shard_ids[0]}-{shard_ids[-1]}", shard_ids, shard_count, args.hub_port)
+            for shard_ids in ranges
+        ))
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    if not os.getenv("DISCORD_TOKEN"):
+        print("❌ DISCORD_TOKEN не найден в .env!")
+        exit(1)
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
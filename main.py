@@ -2,18 +2,33 @@ import discord
 from discord.ext import commands
 import os
 import asyncio
+import io
+import time
 from dotenv import load_dotenv
-from database import init_db
+from database import init_db, db
+from utils.bans import bans
+from utils.cluster import cluster
+from utils.counters import counters
+from utils.metrics import metrics
+from utils.profiler import profile, watchdog
+from utils.retention import archiver
+from utils.roles import roles
+from utils.tickets import tickets
 
 # Загрузка настроек
 load_dotenv()
+cluster.configure()
 
 # Настройка бота
 intents = discord.Intents.default()
 intents.members = True
 intents.message_content = True
 
-bot = commands.Bot(command_prefix="!", intents=intents)
+if cluster.sharded:
+    # SHARD_COUNT=auto — число шардов подскажет Discord; SHARD_IDS — диапазон этого процесса (launcher.py)
+    bot = commands.AutoShardedBot(command_prefix="!", intents=intents, **cluster.shard_kwargs())
+else:
+    bot = commands.Bot(command_prefix="!", intents=intents)
 
 # === Встроенная команда синхронизации ===
 @bot.command(name="sync")
@@ -41,28 +56,128 @@ async def sync_commands(ctx):
         await ctx.send(embed=embed)
         print(f"❌ Ошибка: {e}")
 
+# === Метрики ===
+@bot.command(name="метрики")
+@commands.is_owner()
+async def show_metrics(ctx):
+    """
+    !метрики — задержки команд, слушателей и запросов к БД, лаг event loop.
+    Полный текст в формате Prometheus прикладывается файлом.
+    """
+    report = discord.File(io.BytesIO(metrics.render().encode()), filename="metrics.prom")
+    await ctx.send(f"```\n{metrics.summary()[:1900]}\n```", file=report)
+
+# === Профилирование ===
+profiling = asyncio.Lock()
+
+@bot.command(name="профиль")
+@commands.is_owner()
+async def run_profiler(ctx, seconds: int = 10, mode: str = "sampling"):
+    """
+    !профиль [секунды] [sampling|cprofile] — профилирует event loop и присылает самые частые стеки.
+    sampling почти не нагружает бота, cprofile точнее, но замедляет его на время замера.
+    """
+    if mode not in ("sampling", "cprofile"):
+        await ctx.send("❌ Режим: `sampling` или `cprofile`.")
+        return
+    if profiling.locked():
+        await ctx.send("⏳ Профилирование уже идёт.")
+        return
+    seconds = max(1, min(seconds, 120))
+    async with profiling:
+        await ctx.send(f"🔬 Профилирую {seconds} с ({mode})...")
+        report = await profile(seconds, mode)
+    attachment = discord.File(io.BytesIO(report.encode()), filename=f"profile-{mode}-{int(time.time())}.txt")
+    await ctx.send("✅ Готово.", file=attachment)
+
 # === Загрузка Cogs ===
+async def load_cog(cog: str):
+    try:
+        await bot.load_extension(f"cogs.{cog}")
+        print(f"✅ УСПЕХ: cogs.{cog} загружен")
+    except Exception as e:
+        print(f"❌ ОШИБКА загрузки cogs.{cog}: {type(e).__name__}: {e}")
+
 async def load_cogs():
     cog_files = ["core", "panels", "assignment", "moderation", "stats"]
-    for cog in cog_files:
-        try:
-            await bot.load_extension(f"cogs.{cog}")
-            print(f"✅ УСПЕХ: cogs.{cog} загружен")
-        except Exception as e:
-            print(f"❌ ОШИБКА загрузки cogs.{cog}: {type(e).__name__}: {e}")
+    await asyncio.gather(*(load_cog(cog) for cog in cog_files))
+
+# === Прогрев кэшей ===
+async def warm_caches():
+    """Загружает в память всё, что обработчики читают без обращения к БД"""
+    await asyncio.gather(roles.load(), bans.load(), tickets.load())
+    await counters.refresh()
+
+# === Кластер: изменения из других процессов ===
+async def reload_roles(data: dict):
+    await roles.load()
+
+async def refresh_counters(data: dict):
+    counters.refresh_soon()
+
+cluster.on("roles", reload_roles)
+cluster.on("counters", refresh_counters)
+
+# === Замер времени запуска ===
+class StartupTimer:
+    """Длительность фаз запуска (для лога)"""
+
+    def __init__(self):
+        self.started = self._last = time.perf_counter()
+        self.phases: list[tuple[str, float]] = []
+        self.ready = False
+
+    def mark(self, name: str):
+        now = time.perf_counter()
+        self.phases.append((name, now - self._last))
+        self._last = now
+
+    async def phase(self, name: str, coro):
+        result = await coro
+        self.mark(name)
+        return result
+
+    def report(self, title: str):
+        parts = ", ".join(f"{name} {seconds * 1000:.0f} мс" for name, seconds in self.phases)
+        total = (time.perf_counter() - self.started) * 1000
+        print(f"⏱️ {title}: {parts} (всего {total:.0f} мс)")
+
+startup = StartupTimer()
 
 # === События ===
 @bot.event
 async def on_ready():
+    # on_ready повторяется при каждом переподключении — здесь только лог, вся инициализация уже сделана
     print(f"🟢 {bot.user} успешно запущен!")
     print(f"✅ Подключено к {len(bot.guilds)} серверам")
-    init_db()
-    print("💾 База данных инициализирована!")
+    if not startup.ready:
+        startup.ready = True
+        startup.mark("вход и подключение")
+        startup.report("Запуск")
 
 # === Запуск ===
 async def main():
-    await load_cogs()
-    await bot.start(os.getenv("DISCORD_TOKEN"))
+    async with bot:
+        try:
+            # Хранилище — один раз и до входа, чтобы Cogs никогда не видели БД без таблиц
+            await startup.phase("БД", asyncio.to_thread(init_db))
+            # Кэши и Cogs независимы друг от друга — грузим параллельно
+            await startup.phase("кэши и cogs", asyncio.gather(warm_caches(), load_cogs()))
+            # Слушатели Cogs уже зарегистрированы — оборачиваем их замером времени
+            metrics.instrument(bot)
+            metrics.start()
+            watchdog.start()
+            archiver.start()
+            await cluster.connect()
+            await bot.start(os.getenv("DISCORD_TOKEN"))
+        finally:
+            # Закрываем бота до БД: при выгрузке Cogs идут последние записи (сброс голосовых сессий)
+            await bot.close()
+            await cluster.close()
+            archiver.stop()
+            watchdog.stop()
+            metrics.stop()
+            await db.close()
 
 if __name__ == "__main__":
     token = os.getenv("DISCORD_TOKEN")
@@ -0,0 +1,41 @@
+import re
+import sqlite3
+import pytest
+from database import HOT_QUERY_PLANS, check_query_plans, migrate
+
+# Строка плана, которая читает таблицу через индекс (или по rowid), а не полным перебором
+USES_INDEX = re.compile(r"^(SEARCH|SCAN) \w+ USING (COVERING INDEX \w+|INDEX \w+|INTEGER PRIMARY KEY)")
+
+
+@pytest.fixture(scope="module")
+def conn(tmp_path_factory):
+    conn = sqlite3.connect(tmp_path_factory.mktemp("db") / "greenfild.db", isolation_level=None)
+    migrate(conn)
+    yield conn
+    conn.close()
+
+
+@pytest.mark.parametrize("sql, params, index", HOT_QUERY_PLANS, ids=[sql[:60] for sql, _, _ in HOT_QUERY_PLANS])
+def test_hot_query_uses_index(conn, sql, params, index):
+    plan = [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+    table_reads = [detail for detail in plan if detail.startswith(("SEARCH", "SCAN"))]
+    assert table_reads, plan
+    for detail in table_reads:
+        assert USES_INDEX.match(detail), f"полный перебор: {plan}"
+    assert any(index in detail for detail in table_reads), plan
+
+
+def test_check_query_plans_reports_nothing(conn):
+    assert check_query_plans(conn) == []
+
+
+def test_check_query_plans_reports_missing_index(tmp_path):
+    # Отдельное соединение: sqlite3 кэширует подготовленные EXPLAIN и не перестраивает их после DROP INDEX
+    conn = sqlite3.connect(tmp_path / "greenfild.db", isolation_level=None)
+    try:
+        migrate(conn)
+        conn.execute("DROP INDEX idx_warns_expires")
+        problems = check_query_plans(conn)
+    finally:
+        conn.close()
+    assert problems and all("warns" in problem for problem in problems)
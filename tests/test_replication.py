@@ -0,0 +1,193 @@
+import asyncio
+import sqlite3
+import pytest
+import utils.bans
+import utils.replication
+from database import Database, migrate
+from utils.bans import BanRegistry
+from utils.replication import BanReplicator, SqliteJournalSource
+
+LOCAL = "main"
+PEER = "partner"
+
+
+def create_db(path) -> str:
+    conn = sqlite3.connect(path, isolation_level=None)
+    try:
+        migrate(conn)
+    finally:
+        conn.close()
+    return str(path)
+
+
+def journal(path) -> list[tuple]:
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT action, user_id, origin FROM ban_journal ORDER BY seq").fetchall()
+    finally:
+        conn.close()
+
+
+class Instance:
+    """Инстанс бота на своей БД: BanRegistry и BanReplicator с подменённым модульным db"""
+
+    def __init__(self, monkeypatch, path: str, name: str, peers: dict[str, str]):
+        self.monkeypatch = monkeypatch
+        self.db = Database(path)
+        self.bans = BanRegistry()
+        self.changes: list[tuple] = []
+        monkeypatch.setenv("INSTANCE_NAME", name)
+        monkeypatch.setenv("BAN_REPLICATION_PEERS", ",".join(f"{p}=sqlite:///{a}" for p, a in peers.items()))
+        self.replicator = BanReplicator(self.on_change)
+
+    async def on_change(self, entries: list):
+        self.changes += entries
+
+    def activate(self):
+        # Реестр и репликатор обращаются к модульным db/bans — переключаем их на этот инстанс
+        self.monkeypatch.setattr(utils.bans, "db", self.db)
+        self.monkeypatch.setattr(utils.replication, "bans", self.bans)
+
+    async def pull(self, peer: str = PEER) -> int:
+        self.activate()
+        return await self.replicator.pull(None, peer, self.replicator.peers[peer])
+
+    async def ban(self, user_id: int, reason: str = "спам"):
+        self.activate()
+        await self.bans.ban(user_id, reason, 1, None)
+
+    async def unban(self, user_id: int):
+        self.activate()
+        await self.bans.unban(user_id)
+
+    async def cursor(self, peer: str = PEER) -> int:
+        self.activate()
+        return await self.bans.cursor(peer)
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return create_db(tmp_path / "main.db"), create_db(tmp_path / "partner.db")
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_sqlite_source_names_local_entries(paths):
+    _, partner_path = paths
+    conn = sqlite3.connect(partner_path, isolation_level=None)
+    conn.execute("INSERT INTO ban_journal (action, user_id, origin) VALUES ('ban', 1, NULL), ('ban', 2, 'other')")
+    conn.close()
+
+    page = run(SqliteJournalSource(partner_path, PEER).fetch(None, 0, 10))
+    assert [(entry[2], entry[6]) for entry in page["entries"]] == [(1, PEER), (2, "other")]
+
+
+def test_pull_applies_only_entries_after_cursor(monkeypatch, paths):
+    main_path, partner_path = paths
+    main = Instance(monkeypatch, main_path, LOCAL, {PEER: partner_path})
+    partner = Instance(monkeypatch, partner_path, PEER, {LOCAL: main_path})
+
+    async def scenario():
+        await partner.ban(10)
+        await partner.ban(11)
+        assert await main.pull() == 2
+        first_cursor = await main.cursor()
+
+        await partner.unban(10)
+        await partner.ban(12)
+        main.changes.clear()
+        assert await main.pull() == 2
+        assert [(entry[1], entry[2]) for entry in main.changes] == [("unban", 10), ("ban", 12)]
+        assert await main.cursor() > first_cursor
+        await main.db.close()
+        await partner.db.close()
+
+    run(scenario())
+    assert 10 not in main.bans and 11 in main.bans and 12 in main.bans
+
+
+def test_repeated_pull_is_idempotent(monkeypatch, paths):
+    main_path, partner_path = paths
+    main = Instance(monkeypatch, main_path, LOCAL, {PEER: partner_path})
+    partner = Instance(monkeypatch, partner_path, PEER, {LOCAL: main_path})
+
+    async def scenario():
+        await partner.ban(10)
+        await partner.ban(11)
+        await partner.unban(11)
+        # Бан и разбан 11 в одной порции — итог «не забанен», менять нечего
+        assert await main.pull() == 1
+        journal_before = journal(main_path)
+
+        # Курсор потерян — весь журнал приходит заново, но ничего не меняет
+        await main.db.execute("DELETE FROM replication_cursors")
+        main.changes.clear()
+        assert await main.pull() == 0
+        assert main.changes == []
+        await main.db.close()
+        await partner.db.close()
+        return journal_before
+
+    journal_before = run(scenario())
+    assert journal(main_path) == journal_before
+    assert 10 in main.bans and len(main.bans) == 1
+
+
+def test_cursor_survives_restart(monkeypatch, paths):
+    main_path, partner_path = paths
+    partner = Instance(monkeypatch, partner_path, PEER, {LOCAL: main_path})
+
+    async def first_run():
+        main = Instance(monkeypatch, main_path, LOCAL, {PEER: partner_path})
+        await partner.ban(10)
+        assert await main.pull() == 1
+        cursor = await main.cursor()
+        await main.db.close()
+        return cursor
+
+    cursor = run(first_run())
+
+    async def second_run():
+        main = Instance(monkeypatch, main_path, LOCAL, {PEER: partner_path})
+        main.activate()
+        await main.bans.load()
+        assert await main.cursor() == cursor
+        # Пока инстанс был выключен, у партнёра появилась одна запись — приходит только она
+        await partner.ban(11)
+        assert await main.pull() == 1
+        assert [entry[2] for entry in main.changes] == [11]
+        await main.db.close()
+        await partner.db.close()
+        return main
+
+    main = run(second_run())
+    assert 10 in main.bans and 11 in main.bans
+
+
+def test_own_bans_do_not_come_back(monkeypatch, paths):
+    main_path, partner_path = paths
+    main = Instance(monkeypatch, main_path, LOCAL, {PEER: partner_path})
+    partner = Instance(monkeypatch, partner_path, PEER, {LOCAL: main_path})
+
+    async def scenario():
+        await main.ban(10)
+        # Партнёр забирает бан и пишет его в свой журнал с origin = main
+        assert await partner.pull(LOCAL) == 1
+        assert journal(partner_path) == [("ban", 10, LOCAL)]
+
+        # Бан снят здесь, пока партнёр ещё хранит его в журнале: запись с origin = main
+        # не должна вернуть бан обратно
+        await main.unban(10)
+        journal_before = journal(main_path)
+        assert await main.pull() == 0
+        assert main.changes == []
+        assert await main.cursor() > 0
+        await main.db.close()
+        await partner.db.close()
+        return journal_before
+
+    journal_before = run(scenario())
+    assert journal(main_path) == journal_before
+    assert 10 not in main.bans
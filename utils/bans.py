@@ -0,0 +1,155 @@
+import sqlite3
+import time
+from database import db
+
+JOURNAL_INSERT = """
+    INSERT INTO ban_journal (action, user_id, reason, banned_by, expires_at, origin)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+# Порция журнала после курсора (seq — rowid, выборка идёт по первичному ключу)
+JOURNAL_AFTER = """
+    SELECT seq, action, user_id, reason, banned_by, expires_at, origin FROM ban_journal
+    WHERE seq > ? ORDER BY seq LIMIT ?
+"""
+
+# Запись журнала: (seq, action, user_id, reason, banned_by, expires_at, origin)
+JournalEntry = tuple[int, str, int, str | None, int | None, int | None, str | None]
+
+
+class BanRegistry:
+    """
+    Множество ID пользователей в глобальном бане (кэш таблицы global_bans).
+
+    Все записи в global_bans идут через этот класс, поэтому множество всегда
+    совпадает с таблицей, а проверка `user_id in bans` — O(1) без обращения к БД.
+    Каждое изменение в той же транзакции попадает в ban_journal: по нему другие
+    процессы кластера (sync) и другие инстансы бота (apply_remote) догоняют изменения.
+    """
+
+    def __init__(self):
+        self._banned: set[int] = set()
+        # Последняя запись журнала, отражённая в кэше
+        self.seq = 0
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._banned
+
+    def __len__(self) -> int:
+        return len(self._banned)
+
+    async def load(self):
+        """Загружает всех забаненных из БД"""
+        # Сначала курсор: записи, появившиеся между запросами, sync() применит повторно — это безопасно
+        self.seq = await db.fetchval("SELECT MAX(seq) FROM ban_journal", default=0)
+        rows = await db.fetchall("SELECT user_id FROM global_bans")
+        self._banned = {user_id for user_id, in rows}
+        print(f"🚫 Загружено глобальных банов: {len(self._banned)}")
+
+    async def sync(self, batch: int = 1000) -> list[JournalEntry]:
+        """Применяет к кэшу записи журнала, сделанные другими процессами; возвращает их"""
+        applied = []
+        while True:
+            rows = await db.fetchall(JOURNAL_AFTER, (self.seq, batch))
+            for entry in rows:
+                self._apply_cached(entry)
+            applied += rows
+            if len(rows) < batch:
+                return applied
+
+    def _apply_cached(self, entry: JournalEntry):
+        seq, action, user_id = entry[:3]
+        self._cache(action, user_id)
+        self.seq = max(self.seq, seq)
+
+    def _cache(self, action: str, user_id: int):
+        if action == "ban":
+            self._banned.add(user_id)
+        else:
+            self._banned.discard(user_id)
+
+    async def ban(self, user_id: int, reason: str, banned_by: int, expires_at: int | None):
+        async with db.transaction() as tx:
+            await tx.execute(
+                "INSERT OR REPLACE INTO global_bans (user_id, reason, banned_by, expires_at) VALUES (?, ?, ?, ?)",
+                (user_id, reason, banned_by, expires_at)
+            )
+            await tx.execute(JOURNAL_INSERT, ("ban", user_id, reason, banned_by, expires_at, None))
+        self._banned.add(user_id)
+
+    async def unban(self, user_id: int) -> bool:
+        """Снимает бан, возвращает True, если он был"""
+        async with db.transaction() as tx:
+            cursor = await tx.execute("DELETE FROM global_bans WHERE user_id = ?", (user_id,))
+            deleted = cursor.rowcount > 0
+            if deleted:
+                await tx.execute(JOURNAL_INSERT, ("unban", user_id, None, None, None, None))
+        self._banned.discard(user_id)
+        return deleted
+
+    async def expire(self, user_ids: list[int], now: int) -> list[int]:
+        """Снимает баны, срок которых действительно истёк к now; возвращает снятые"""
+        placeholders = ", ".join("?" * len(user_ids))
+        async with db.transaction() as tx:
+            # Перепроверяем срок: бан могли продлить или сделать вечным
+            rows = await tx.fetchall(
+                f"SELECT user_id FROM global_bans WHERE user_id IN ({placeholders}) AND expires_at <= ?",
+                (*user_ids, now)
+            )
+            expired = [user_id for user_id, in rows]
+            await tx.executemany("DELETE FROM global_bans WHERE user_id = ?", [(user_id,) for user_id in expired])
+            await tx.executemany(JOURNAL_INSERT, [("unban", user_id, None, None, None, None) for user_id in expired])
+        self._banned.difference_update(expired)
+        return expired
+
+    async def apply_remote(self, peer: str, entries: list[JournalEntry], last_seq: int) -> list[JournalEntry]:
+        """
+        Применяет порцию журнала другого инстанса и сдвигает его курсор — одной транзакцией.
+
+        Идемпотентно: из порции берётся последняя запись по каждому пользователю, и запись,
+        которая не меняет global_bans (бан уже есть с теми же причиной и сроком, разбан уже
+        снятого), пропускается и в свой журнал не попадает. Поэтому повторно забранная порция
+        ничего не меняет, а инстансы, забирающие журналы друг у друга, не гоняют записи по кругу.
+        Возвращает записи, которые что-то изменили.
+        """
+        # Важно только итоговое состояние: бан+разбан одного пользователя в порции — один разбан
+        latest = sorted({entry[2]: entry for entry in entries}.values())
+
+        def apply(conn: sqlite3.Connection) -> list[JournalEntry]:
+            changed = []
+            for entry in latest:
+                _, action, user_id, reason, banned_by, expires_at, origin = entry
+                current = conn.execute(
+                    "SELECT reason, expires_at FROM global_bans WHERE user_id = ?", (user_id,)
+                ).fetchone()
+                if action == "ban":
+                    if current == (reason, expires_at):
+                        continue
+                    conn.execute(
+                        "INSERT OR REPLACE INTO global_bans (user_id, reason, banned_by, expires_at) VALUES (?, ?, ?, ?)",
+                        (user_id, reason, banned_by, expires_at)
+                    )
+                else:
+                    if current is None:
+                        continue
+                    conn.execute("DELETE FROM global_bans WHERE user_id = ?", (user_id,))
+                conn.execute(JOURNAL_INSERT, (action, user_id, reason, banned_by, expires_at, origin))
+                changed.append(entry)
+            conn.execute(
+                "INSERT INTO replication_cursors (peer, last_seq, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (peer) DO UPDATE SET last_seq = excluded.last_seq, updated_at = excluded.updated_at",
+                (peer, last_seq, int(time.time()))
+            )
+            return changed
+
+        changed = await db.run_in_transaction(apply)
+        # seq у записей — из журнала источника, свой курсор кэша (self.seq) они не двигают
+        for _, action, user_id, *_ in changed:
+            self._cache(action, user_id)
+        return changed
+
+    async def cursor(self, peer: str) -> int:
+        return await db.fetchval("SELECT last_seq FROM replication_cursors WHERE peer = ?", (peer,), default=0)
+
+
+bans = BanRegistry()
@@ -0,0 +1,219 @@
+import asyncio
+import itertools
+import json
+import os
+
+# Сколько ждать ответов других процессов на запрос (например, рассылку глобального бана)
+REQUEST_TIMEOUT = 120
+RECONNECT_DELAY = 5
+
+
+def parse_shard_ids(value: str) -> list[int]:
+    """'0-3,8' → [0, 1, 2, 3, 8]"""
+    ids = []
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start, _, end = part.partition("-")
+        ids.extend(range(int(start), int(end or start) + 1))
+    return ids
+
+
+def _encode(message: dict) -> bytes:
+    return json.dumps(message, ensure_ascii=False).encode() + b"\n"
+
+
+class Cluster:
+    """
+    Процесс бота в составе кластера.
+
+    Один процесс обслуживает диапазон шардов (SHARD_IDS из SHARD_COUNT), процессы
+    связаны через хаб (CLUSTER_ADDRESS, его поднимает launcher.py). По хабу ходят:
+    - publish(event, **data) — уведомления всем остальным процессам (сброс кэшей);
+    - request(event, **data) — то же, но с ожиданием ответов (рассылка бана по серверам,
+      которые живут в других процессах).
+    Без настроек кластера это один процесс со всеми серверами, publish/request ничего не делают.
+    """
+
+    def __init__(self):
+        self.name = "main"
+        self.shard_count: int | None = None
+        self.shard_ids: list[int] | None = None
+        self.sharded = False
+        self.address: tuple[str, int] | None = None
+        self._handlers: dict[str, object] = {}
+        self._writer: asyncio.StreamWriter | None = None
+        self._task: asyncio.Task | None = None
+        self._ids = itertools.count(1)
+        # id запроса → {"done": Future, "replies": [...], "expected": число ответов или None}
+        self._waiting: dict[int, dict] = {}
+
+    def configure(self):
+        """Читает SHARD_COUNT / SHARD_IDS / CLUSTER_NAME / CLUSTER_ADDRESS (после load_dotenv)"""
+        shard_count = os.getenv("SHARD_COUNT", "")
+        self.sharded = bool(shard_count)
+        if shard_count.isdigit():
+            self.shard_count = int(shard_count)
+            shard_ids = os.getenv("SHARD_IDS")
+            self.shard_ids = parse_shard_ids(shard_ids) if shard_ids else None
+        address = os.getenv("CLUSTER_ADDRESS")
+        if address:
+            host, _, port = address.rpartition(":")
+            self.address = (host or "127.0.0.1", int(port))
+        self.name = os.getenv("CLUSTER_NAME", self.name)
+
+    # === Шарды и принадлежность серверов ===
+    @property
+    def primary(self) -> bool:
+        """Процесс, который выполняет общие для всего проекта задачи (сроки глобальных банов)"""
+        return not self.shard_ids or 0 in self.shard_ids
+
+    def shard_kwargs(self) -> dict:
+        """Аргументы для commands.AutoShardedBot"""
+        kwargs = {}
+        if self.shard_count is not None:
+            kwargs["shard_count"] = self.shard_count
+        if self.shard_ids is not None:
+            kwargs["shard_ids"] = self.shard_ids
+        return kwargs
+
+    def guild_filter(self, column: str = "guild_id") -> str:
+        """SQL-условие «сервер обслуживает этот процесс» (формула шардинга Discord)"""
+        if not self.shard_ids:
+            return "1"
+        ids = ", ".join(str(shard_id) for shard_id in self.shard_ids)
+        return f"(({column} >> 22) % {self.shard_count}) IN ({ids})"
+
+    def meta_key(self, key: str) -> str:
+        """Ключ bot_meta, своя копия которого есть у каждого процесса"""
+        return key if not self.shard_ids else f"{key}:{self.name}"
+
+    # === Обмен сообщениями ===
+    def on(self, event: str, handler):
+        """handler(data) -> dict | None — ответ уходит отправителю request()"""
+        self._handlers[event] = handler
+
+    def off(self, event: str):
+        self._handlers.pop(event, None)
+
+    async def connect(self):
+        if self.address and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self._writer:
+            self._writer.close()
+            self._writer = None
+
+    def publish(self, event: str, **data):
+        self._send({"type": "event", "event": event, "data": data})
+
+    async def request(self, event: str, timeout: float = REQUEST_TIMEOUT, **data) -> list[dict]:
+        """Отправляет событие всем процессам и ждёт их ответы (сколько успело за timeout)"""
+        if self._writer is None:
+            return []
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        replies: list[dict] = []
+        self._waiting[request_id] = {"done": future, "replies": replies, "expected": None}
+        self._send({"type": "event", "event": event, "data": data, "id": request_id})
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._waiting.pop(request_id, None)
+        return replies
+
+    def _send(self, message: dict):
+        if self._writer is None or self._writer.is_closing():
+            return
+        message["from"] = self.name
+        self._writer.write(_encode(message))
+
+    async def _run(self):
+        while True:
+            try:
+                reader, self._writer = await asyncio.open_connection(*self.address)
+                self._send({"type": "hello"})
+                print(f"🔗 Кластер: процесс {self.name} подключён к хабу")
+                while line := await reader.readline():
+                    self._receive(json.loads(line))
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Кластер: нет связи с хабом ({type(e).__name__}), повтор через {RECONNECT_DELAY} с")
+            finally:
+                self._writer = None
+                for waiting in self._waiting.values():
+                    if not waiting["done"].done():
+                        waiting["done"].set_result(None)
+            await asyncio.sleep(RECONNECT_DELAY)
+
+    def _receive(self, message: dict):
+        kind = message["type"]
+        if kind == "event":
+            asyncio.create_task(self._handle(message))
+            return
+        waiting = self._waiting.get(message.get("id"))
+        if waiting is None:
+            return
+        if kind == "reply":
+            waiting["replies"].append(message["data"])
+        elif kind == "peers":
+            waiting["expected"] = message["count"]
+        expected = waiting["expected"]
+        if expected is not None and len(waiting["replies"]) >= expected and not waiting["done"].done():
+            waiting["done"].set_result(None)
+
+    async def _handle(self, message: dict):
+        handler = self._handlers.get(message["event"])
+        result = None
+        try:
+            if handler is not None:
+                result = await handler(message["data"])
+        except Exception as e:
+            print(f"❌ Кластер: ошибка обработки {message['event']}: {e}")
+            result = {"error": f"{type(e).__name__}: {e}"}
+        if "id" in message:
+            self._send({"type": "reply", "to": message["from"], "id": message["id"], "data": result or {}})
+
+
+class ClusterHub:
+    """Хаб кластера: пересылает события всем процессам, кроме отправителя, и ответы — адресату"""
+
+    def __init__(self):
+        self._peers: dict[str, asyncio.StreamWriter] = {}
+
+    async def serve(self, host: str, port: int) -> asyncio.AbstractServer:
+        return await asyncio.start_server(self._connection, host, port)
+
+    async def _connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        name = None
+        try:
+            while line := await reader.readline():
+                message = json.loads(line)
+                name = message["from"]
+                if message["type"] == "hello":
+                    self._peers[name] = writer
+                elif message["type"] == "event":
+                    others = [peer for peer_name, peer in self._peers.items() if peer_name != name]
+                    if "id" in message:
+                        writer.write(_encode({"type": "peers", "id": message["id"], "count": len(others)}))
+                    for peer in others:
+                        peer.write(line)
+                elif message["type"] == "reply":
+                    peer = self._peers.get(message["to"])
+                    if peer is not None:
+                        peer.write(line)
+        except (OSError, ValueError):
+            pass
+        finally:
+            if name is not None and self._peers.get(name) is writer:
+                del self._peers[name]
+            writer.close()
+
+
+cluster = Cluster()
@@ -0,0 +1,70 @@
+import asyncio
+import time
+from database import db
+from utils.bans import bans
+
+
+class StatsCounters:
+    """
+    Счётчики для /статистика и кнопки статистики главной панели.
+
+    Обновляются в момент записи (варны, назначения, голосовое время),
+    поэтому чтение — O(1) без COUNT/SUM по таблицам.
+    refresh() пересчитывает реальные значения (при старте и периодически для сверки).
+    """
+
+    def __init__(self):
+        self.warns = 0
+        # Момент последнего пересчёта: варны со сроком до него в self.warns уже не входят
+        self.warns_counted_at = 0
+        self.assignments = 0
+        self.voice_seconds: dict[int, int] = {}
+        self._refresh_pending = False
+
+    @property
+    def global_bans(self) -> int:
+        return len(bans)
+
+    def expire_warns(self, deadlines, deleted: int):
+        """
+        Вычитает снятые варны. Входили в счётчик только те, чей срок позже последнего пересчёта:
+        просроченные за время простоя refresh() уже не посчитал. deleted — сколько строк реально удалено.
+        """
+        counted = sum(1 for expires_at in deadlines if expires_at is not None and expires_at > self.warns_counted_at)
+        self.warns -= min(counted, deleted)
+
+    def add_voice(self, guild_id: int, seconds: int):
+        if seconds:
+            self.voice_seconds[guild_id] = self.voice_seconds.get(guild_id, 0) + seconds
+
+    async def refresh(self) -> bool:
+        """Пересчитывает счётчики по таблицам; возвращает True, если было расхождение"""
+        now = int(time.time())
+        warns = await db.fetchval("SELECT COUNT(*) FROM warns WHERE expires_at > ?", (now,), default=0)
+        # Перенесённые в архив назначения (utils/retention.py) тоже входят в итог
+        assignments = await db.fetchval("SELECT COUNT(*) FROM assignment_logs", default=0) + await db.fetchval(
+            "SELECT value FROM bot_meta WHERE key = 'archived:assignment_logs'", default=0
+        )
+        rows = await db.fetchall("SELECT guild_id, SUM(total_seconds) FROM online_time GROUP BY guild_id")
+        voice_seconds = {guild_id: total or 0 for guild_id, total in rows}
+
+        drift = (warns, assignments, voice_seconds) != (self.warns, self.assignments, self.voice_seconds)
+        self.warns, self.assignments, self.voice_seconds = warns, assignments, voice_seconds
+        self.warns_counted_at = now
+        return drift
+
+    def refresh_soon(self, delay: float = 5):
+        """Пересчёт через delay секунд; повторные вызовы за это время объединяются (изменения в других процессах)"""
+        if self._refresh_pending:
+            return
+        self._refresh_pending = True
+
+        async def run():
+            await asyncio.sleep(delay)
+            self._refresh_pending = False
+            await self.refresh()
+
+        asyncio.create_task(run())
+
+
+counters = StatsCounters()
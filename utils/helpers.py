@@ -1,9 +1,9 @@
-import sqlite3
 import discord
+from utils.roles import roles
 
 def get_role_id(role_name: str) -> int | None:
     """
-    Получает ID роли из базы данных по её ключу.
+    Получает ID роли по её ключу (из кэша ролей, без обращения к БД).
 
     Примеры role_name:
         'leadership'         → Руководство проекта
@@ -16,16 +16,7 @@ def get_role_id(role_name: str) -> int | None:
         'movie'              → Movie (роль медиа)
         'default_member'     → Игрок (при входе)
     """
-    try:
-        conn = sqlite3.connect("greenfild.db")
-        c = conn.cursor()
-        c.execute("SELECT role_id FROM project_roles WHERE role_name = ?", (role_name,))
-        row = c.fetchone()
-        conn.close()
-        return row[0] if row else None
-    except Exception as e:
-        print(f"❌ Ошибка в get_role_id('{role_name}'): {e}")
-        return None
+    return roles.get(role_name)
 
 def has_management_access(user: discord.Member) -> bool:
     """
@@ -38,19 +29,7 @@ def has_management_access(user: discord.Member) -> bool:
         - Deputy Chief Administrator
         - Chief Curator
     """
-    allowed_roles = [
-        "leadership",
-        "project_team",
-        "chief_admin",
-        "deputy_chief",
-        "chief_curator"
-    ]
-
-    for role_key in allowed_roles:
-        role_id = get_role_id(role_key)
-        if role_id and role_id in [r.id for r in user.roles]:
-            return True
-    return False
+    return roles.has_access(user, "management")
 
 def log_to_channel(guild: discord.Guild, message: str):
     """
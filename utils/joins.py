@@ -0,0 +1,142 @@
+import asyncio
+import time
+from collections import deque
+from utils.settings import settings
+
+
+class JoinPipeline:
+    """
+    Очередь обработки входов участников.
+
+    on_member_join только ставит участника в очередь, работу делает пул обработчиков:
+    - выдача стартовой роли всегда идёт раньше приветствий в ЛС;
+    - роли выдаются по очереди серверов (round-robin) с ограничением
+      одновременных запросов на сервер — рейд на одном сервере не забивает остальные;
+    - приветствия при перегрузке откладываются или отбрасываются (join_pipeline в settings.json).
+    """
+
+    def __init__(self, grant_role, send_welcome):
+        self._grant_role = grant_role
+        self._send_welcome = send_welcome
+        self._roles: dict[int, deque] = {}      # guild_id → (member, enqueued_at)
+        self._active: dict[int, int] = {}       # guild_id → выдач ролей в работе
+        self._dms: deque = deque()
+        self._wakeup = asyncio.Event()
+        self._workers: list[asyncio.Task] = []
+
+        # Счётчики
+        self.role_queue_depth = 0
+        self.processed_roles = 0
+        self.processed_dms = 0
+        self.dropped_dms = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+    # === Жизненный цикл ===
+    def start(self):
+        if not self._workers:
+            workers = int(settings.join_pipeline["workers"])
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(max(workers, 1))]
+
+    def stop(self):
+        for task in self._workers:
+            task.cancel()
+        self._workers = []
+
+    # === Постановка в очередь ===
+    def submit(self, member):
+        now = time.monotonic()
+        self._roles.setdefault(member.guild.id, deque()).append((member, now))
+        self.role_queue_depth += 1
+        self._submit_dm(member, now)
+        self._wakeup.set()
+
+    def _submit_dm(self, member, now: float):
+        config = settings.join_pipeline
+        if config["dm_overload_policy"] == "drop" and self.role_queue_depth >= config["overload_threshold"]:
+            self.dropped_dms += 1
+            return
+        self._dms.append((member, now))
+        while len(self._dms) > config["dm_queue_limit"]:
+            self._dms.popleft()
+            self.dropped_dms += 1
+
+    def stats(self) -> dict:
+        return {
+            "role_queue": self.role_queue_depth,
+            "dm_queue": len(self._dms),
+            "processed_roles": self.processed_roles,
+            "processed_dms": self.processed_dms,
+            "dropped_dms": self.dropped_dms,
+            "last_lag": round(self.last_lag, 2),
+            "max_lag": round(self.max_lag, 2),
+        }
+
+    # === Обработка ===
+    def _next_role_job(self):
+        """Следующая выдача роли с сервера, у которого есть свободный слот"""
+        limit = settings.join_pipeline["per_guild_concurrency"]
+        for guild_id in list(self._roles):
+            if self._active.get(guild_id, 0) >= limit:
+                continue
+            queue = self._roles.pop(guild_id)
+            job = queue.popleft()
+            if queue:
+                # Сервер уходит в конец очереди — round-robin между серверами
+                self._roles[guild_id] = queue
+            self.role_queue_depth -= 1
+            self._active[guild_id] = self._active.get(guild_id, 0) + 1
+            return guild_id, job
+        return None
+
+    def _next_dm_job(self):
+        config = settings.join_pipeline
+        max_lag = config["max_dm_lag_seconds"]
+        now = time.monotonic()
+        while self._dms:
+            # Пока есть роли в очереди, приветствия ждут (при 'drop' — не копятся сверх порога)
+            if self.role_queue_depth:
+                return None
+            member, enqueued_at = self._dms.popleft()
+            if now - enqueued_at > max_lag:
+                self.dropped_dms += 1
+                continue
+            return member, enqueued_at
+        return None
+
+    def _record_lag(self, enqueued_at: float):
+        self.last_lag = time.monotonic() - enqueued_at
+        self.max_lag = max(self.max_lag, self.last_lag)
+
+    async def _worker(self):
+        while True:
+            role = self._next_role_job()
+            if role is not None:
+                guild_id, (member, enqueued_at) = role
+                self._record_lag(enqueued_at)
+                try:
+                    await self._grant_role(member)
+                except Exception as e:
+                    print(f"❌ Ошибка выдачи стартовой роли {member}: {e}")
+                finally:
+                    self._active[guild_id] -= 1
+                    if not self._active[guild_id]:
+                        del self._active[guild_id]
+                    self.processed_roles += 1
+                    self._wakeup.set()
+                continue
+
+            dm = self._next_dm_job()
+            if dm is not None:
+                member, enqueued_at = dm
+                self._record_lag(enqueued_at)
+                try:
+                    await self._send_welcome(member)
+                except Exception as e:
+                    print(f"❌ Ошибка отправки приветствия {member}: {e}")
+                finally:
+                    self.processed_dms += 1
+                continue
+
+            self._wakeup.clear()
+            await self._wakeup.wait()
@@ -0,0 +1,114 @@
+import bisect
+import time
+from database import db
+from utils.voice import VoiceSessionBuffer
+
+PAGE_SIZE = 10
+# Сколько секунд страница топа берётся из кэша
+CACHE_TTL = 30
+
+# Курсор — (время, user_id) последней строки предыдущей страницы; None — первая страница
+Cursor = tuple[int, int] | None
+
+GUILD_PAGE = """
+    SELECT user_id, total_seconds FROM online_time
+    WHERE guild_id = ? AND (total_seconds, user_id) < (?, ?)
+    ORDER BY total_seconds DESC, user_id DESC
+    LIMIT ?
+"""
+
+
+class VoiceLeaderboard:
+    """
+    Топ по времени в голосовых каналах (по серверу и по всему проекту).
+
+    Сервер: keyset-пагинация по индексу (guild_id, total_seconds DESC, user_id DESC).
+    Текущие и ещё не записанные сессии берутся из буфера в памяти и подмешиваются
+    к выборке — строки в БД ради этого не переписываются.
+    Проект: суммы по пользователю считаются одним GROUP BY раз в CACHE_TTL.
+    Готовые страницы кэшируются на CACHE_TTL секунд.
+    """
+
+    def __init__(self, sessions: VoiceSessionBuffer):
+        self.sessions = sessions
+        self._pages: dict[tuple, tuple[float, list]] = {}
+        self._project: tuple[float, list[tuple[int, int]], dict[int, int]] | None = None
+
+    async def page(self, guild_id: int | None, cursor: Cursor = None, size: int = PAGE_SIZE) -> list[tuple[int, int]]:
+        """Страница топа: [(user_id, секунд), ...]; guild_id=None — весь проект"""
+        cache_key = (guild_id, cursor, size)
+        cached = self._pages.get(cache_key)
+        now = time.monotonic()
+        if cached and cached[0] > now:
+            return cached[1]
+
+        if guild_id is None:
+            result = await self._project_page(cursor, size)
+        else:
+            result = await self._guild_page(guild_id, cursor, size)
+
+        self._pages = {k: v for k, v in self._pages.items() if v[0] > now}
+        self._pages[cache_key] = (now + CACHE_TTL, result)
+        return result
+
+    @staticmethod
+    def _after(cursor: Cursor, total: int, user_id: int) -> bool:
+        return cursor is None or (total, user_id) < cursor
+
+    async def _guild_page(self, guild_id: int, cursor: Cursor, size: int) -> list[tuple[int, int]]:
+        extra = {user_id: seconds for (user_id, _), seconds in self.sessions.unflushed_seconds(int(time.time()), guild_id).items()}
+        bound = cursor or (2 ** 63 - 1, 2 ** 63 - 1)
+        # Запас на строки пользователей, чьё время в памяти больше, чем в БД
+        rows = await db.fetchall(GUILD_PAGE, (guild_id, *bound, size + len(extra)))
+
+        stored = dict(rows)
+        candidates = {user_id: total for user_id, total in rows if user_id not in extra}
+        if extra:
+            # У участников в голосе итог может отличаться от БД — берём их сохранённое время отдельно
+            missing = [user_id for user_id in extra if user_id not in stored]
+            if missing:
+                placeholders = ", ".join("?" * len(missing))
+                stored.update(await db.fetchall(
+                    f"SELECT user_id, total_seconds FROM online_time WHERE guild_id = ? AND user_id IN ({placeholders})",
+                    (guild_id, *missing)
+                ))
+            for user_id, seconds in extra.items():
+                candidates[user_id] = stored.get(user_id, 0) + seconds
+
+        ranked = sorted(
+            ((total, user_id) for user_id, total in candidates.items() if self._after(cursor, total, user_id)),
+            reverse=True
+        )
+        return [(user_id, total) for total, user_id in ranked[:size]]
+
+    async def _project_totals(self) -> tuple[list[tuple[int, int]], dict[int, int]]:
+        """Сохранённые суммы по пользователям: по убыванию (total, user_id) и словарём; кэш на CACHE_TTL"""
+        now = time.monotonic()
+        if self._project and self._project[0] > now:
+            return self._project[1], self._project[2]
+        rows = await db.fetchall("SELECT user_id, SUM(total_seconds) FROM online_time GROUP BY user_id")
+        by_user = {user_id: total or 0 for user_id, total in rows}
+        totals = sorted(((total, user_id) for user_id, total in by_user.items()), reverse=True)
+        self._project = (now + CACHE_TTL, totals, by_user)
+        return totals, by_user
+
+    async def _project_page(self, cursor: Cursor, size: int) -> list[tuple[int, int]]:
+        totals, stored = await self._project_totals()
+        extra: dict[int, int] = {}
+        for (user_id, _), seconds in self.sessions.unflushed_seconds(int(time.time())).items():
+            extra[user_id] = extra.get(user_id, 0) + seconds
+
+        # Позиция курсора в списке по убыванию (bisect по инвертированному ключу)
+        start = 0
+        if cursor is not None:
+            start = bisect.bisect_right(totals, (-cursor[0], -cursor[1]), key=lambda item: (-item[0], -item[1]))
+        window = [(total, user_id) for total, user_id in totals[start:start + size + len(extra)] if user_id not in extra]
+
+        for user_id, seconds in extra.items():
+            total = stored.get(user_id, 0) + seconds
+            if self._after(cursor, total, user_id):
+                window.append((total, user_id))
+
+        window.sort(reverse=True)
+        return [(user_id, total) for total, user_id in window[:size]]
+
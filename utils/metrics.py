@@ -0,0 +1,255 @@
+import asyncio
+import bisect
+import os
+import re
+import time
+import discord
+from discord.ext import commands
+from database import db
+
+# Границы корзин гистограмм (секунды), как у Prometheus
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_SQL_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE)\s+(\w+)", re.IGNORECASE)
+
+
+def _query_labels(sql: str) -> tuple[str, str]:
+    """Тип запроса и основная таблица: ('SELECT', 'warns'); для run_in_transaction — имя функции"""
+    head, _, rest = sql.strip().partition(" ")
+    if head == "TRANSACTION":
+        return head, rest
+    match = _SQL_TABLE.search(sql)
+    return head.upper(), match.group(1) if match else ""
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами: observe() — один bisect и два сложения"""
+
+    __slots__ = ("counts", "count", "total")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def quantile(self, q: float) -> float:
+        """Оценка квантиля по верхней границе корзины"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return BUCKETS[i] if i < len(BUCKETS) else float("inf")
+        return float("inf")
+
+
+class Metrics:
+    """
+    Метрики процесса: задержки команд и слушателей, запросы SQLite,
+    время до ответа на взаимодействие и лаг event loop.
+    Экспорт — текст в формате Prometheus (команда !метрики, файл или локальный HTTP).
+    """
+
+    def __init__(self):
+        self._histograms: dict[tuple[str, tuple], Histogram] = {}
+        self._counters: dict[tuple[str, tuple], int] = {}
+        # Текущие значения, которые снимаются в момент экспорта: префикс → функция, возвращающая {имя: число}
+        self._gauges: dict[str, callable] = {}
+        self._interactions: dict[int, float] = {}
+        self.loop_lag = 0.0
+        self._tasks: list[asyncio.Task] = []
+        self._query_labels: dict[str, tuple[str, str]] = {}
+
+    # === Запись ===
+    def observe(self, name: str, seconds: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = Histogram()
+        histogram.observe(seconds)
+
+    def inc(self, name: str, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        self._counters[key] = self._counters.get(key, 0) + 1
+
+    def gauges(self, prefix: str, read):
+        """Регистрирует read() → {имя: число}; экспортируется как <prefix>_<имя>. read=None — снять"""
+        if read is None:
+            self._gauges.pop(prefix, None)
+        else:
+            self._gauges[prefix] = read
+
+    def _gauge_values(self) -> list[tuple[str, float]]:
+        values = []
+        for prefix, read in sorted(self._gauges.items()):
+            values += [(f"{prefix}_{name}", value) for name, value in read().items()]
+        return values
+
+    def _on_query(self, kind: str, sql: str, seconds: float):
+        labels = self._query_labels.get(sql)
+        if labels is None:
+            # Запросы — константы, разбор SQL выполняется один раз на текст
+            if len(self._query_labels) > 1000:
+                self._query_labels.clear()
+            labels = self._query_labels[sql] = _query_labels(sql)
+        statement, table = labels
+        self.observe("greenfild_db_query_seconds", seconds, kind=kind, statement=statement, table=table)
+
+    # === Подключение к боту ===
+    def instrument(self, bot: commands.Bot):
+        """Подключает хуки: слушатели Cogs, app-команды, запросы к БД"""
+        for event, listeners in bot.extra_events.items():
+            for i, listener in enumerate(listeners):
+                if not isinstance(listener, _TimedListener):
+                    listeners[i] = _TimedListener(self, event, listener)
+
+        db.on_query = self._on_query
+
+        @bot.listen("on_interaction")
+        async def metrics_interaction_started(interaction: discord.Interaction):
+            self._interactions[interaction.id] = time.perf_counter()
+            self.inc("greenfild_interactions_total", type=interaction.type.name)
+
+        @bot.listen("on_app_command_completion")
+        async def metrics_command_completed(interaction: discord.Interaction, command):
+            self._finish_command(interaction, command.qualified_name, "ok")
+
+        @bot.tree.error
+        async def metrics_command_failed(interaction: discord.Interaction, error: discord.app_commands.AppCommandError):
+            name = interaction.command.qualified_name if interaction.command else "?"
+            self._finish_command(interaction, name, "error")
+            # Стандартная обработка (лог с трейсбеком) остаётся прежней
+            await discord.app_commands.CommandTree.on_error(bot.tree, interaction, error)
+
+    def _finish_command(self, interaction: discord.Interaction, name: str, status: str):
+        started = self._interactions.pop(interaction.id, None)
+        if started is not None:
+            self.observe("greenfild_command_seconds", time.perf_counter() - started, command=name, status=status)
+        # От создания взаимодействия в Discord до завершения обработчика (включая сеть)
+        age = (discord.utils.utcnow() - interaction.created_at).total_seconds()
+        self.observe("greenfild_interaction_response_seconds", age, command=name)
+
+    def start(self):
+        """Фоновые задачи: замер лага event loop и экспорт (METRICS_FILE / METRICS_PORT)"""
+        self._tasks.append(asyncio.create_task(self._measure_loop_lag()))
+        if os.getenv("METRICS_FILE"):
+            self._tasks.append(asyncio.create_task(self._write_file(os.getenv("METRICS_FILE"))))
+        if os.getenv("METRICS_PORT", "").isdigit():
+            self._tasks.append(asyncio.create_task(self._serve_http(int(os.getenv("METRICS_PORT")))))
+
+    def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks.clear()
+
+    async def _measure_loop_lag(self, interval: float = 0.5):
+        loop = asyncio.get_running_loop()
+        while True:
+            t0 = loop.time()
+            await asyncio.sleep(interval)
+            self.loop_lag = max(loop.time() - t0 - interval, 0.0)
+            self.observe("greenfild_event_loop_lag_seconds", self.loop_lag)
+            # Забытые взаимодействия (без completion) не должны копиться
+            if len(self._interactions) > 1000:
+                self._interactions.clear()
+
+    async def _write_file(self, path: str, interval: float = 15):
+        while True:
+            await asyncio.sleep(interval)
+            text = self.render()
+            await asyncio.to_thread(_write_atomic, path, text)
+
+    async def _serve_http(self, port: int):
+        from aiohttp import web
+
+        async def handle(request):
+            return web.Response(text=self.render(), content_type="text/plain")
+
+        app = web.Application()
+        app.router.add_get("/metrics", handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", port).start()
+        print(f"📈 Метрики: http://127.0.0.1:{port}/metrics")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
+
+    # === Экспорт ===
+    def render(self) -> str:
+        """Текст в формате Prometheus"""
+        lines = []
+        for (name, labels), value in sorted(self._counters.items()):
+            lines.append(f"{name}{_labels(labels)} {value}")
+        for (name, labels), h in sorted(self._histograms.items()):
+            cumulative = 0
+            for bound, n in zip(BUCKETS, h.counts):
+                cumulative += n
+                lines.append(f"{name}_bucket{_labels(labels + (('le', repr(bound)),))} {cumulative}")
+            lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {h.count}")
+            lines.append(f"{name}_sum{_labels(labels)} {h.total:.6f}")
+            lines.append(f"{name}_count{_labels(labels)} {h.count}")
+        lines.append(f"greenfild_event_loop_lag_current_seconds {self.loop_lag:.6f}")
+        lines += [f"{name} {value}" for name, value in self._gauge_values()]
+        return "\n".join(lines) + "\n"
+
+    def summary(self, limit: int = 15) -> str:
+        """Краткая таблица для Discord: самые медленные по p99"""
+        rows = sorted(self._histograms.items(), key=lambda item: item[1].quantile(0.99), reverse=True)[:limit]
+        out = [f"{'метрика':<52} {'n':>7} {'p50 мс':>8} {'p99 мс':>8}"]
+        for (name, labels), h in rows:
+            label = ",".join(f"{k}={v}" for k, v in labels if v)
+            title = name.removeprefix("greenfild_").removesuffix("_seconds") + (f"[{label}]" if label else "")
+            out.append(f"{title[:52]:<52} {h.count:>7} {h.quantile(0.5) * 1000:>8.1f} {h.quantile(0.99) * 1000:>8.1f}")
+        out.append(f"лаг event loop сейчас: {self.loop_lag * 1000:.1f} мс")
+        out += [f"{name.removeprefix('greenfild_')}: {value}" for name, value in self._gauge_values()]
+        return "\n".join(out)
+
+
+class _TimedListener:
+    """Обёртка слушателя Cog: замеряет время, а для remove_listener равна исходной функции"""
+
+    def __init__(self, metrics: Metrics, event: str, func):
+        self.metrics = metrics
+        self.event = event
+        self.func = func
+        self.__name__ = getattr(func, "__name__", event)
+        self.__qualname__ = getattr(func, "__qualname__", self.__name__)
+
+    async def __call__(self, *args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return await self.func(*args, **kwargs)
+        finally:
+            self.metrics.observe("greenfild_listener_seconds", time.perf_counter() - t0,
+                                 event=self.event, handler=self.__qualname__)
+
+    def __eq__(self, other) -> bool:
+        return self.func == (other.func if isinstance(other, _TimedListener) else other)
+
+    def __hash__(self) -> int:
+        return hash(self.func)
+
+
+def _labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+def _write_atomic(path: str, text: str):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+metrics = Metrics()
@@ -0,0 +1,45 @@
+import discord
+
+
+class KeysetPageView(discord.ui.View):
+    """
+    Постраничный просмотр с keyset-пагинацией: страницы подгружаются по нажатию кнопок.
+
+    fetch(cursor, size) — async, до size строк после cursor (None — с начала);
+    cursor_of(row) — курсор, с которого начинается страница после этой строки;
+    render(rows, page) — embed страницы (page с 1).
+    Строк запрашивается на одну больше страницы, чтобы знать, есть ли следующая.
+    """
+
+    def __init__(self, fetch, cursor_of, render, page_size: int, timeout: float = 300):
+        super().__init__(timeout=timeout)
+        self.fetch = fetch
+        self.cursor_of = cursor_of
+        self.render = render
+        self.page_size = page_size
+        # Курсоры начала каждой открытой страницы — для кнопки «Назад»
+        self.cursors = [None]
+        self.rows = []
+
+    async def load(self):
+        rows = await self.fetch(self.cursors[-1], self.page_size + 1)
+        self.rows = rows[:self.page_size]
+        self.prev_page.disabled = len(self.cursors) == 1
+        self.next_page.disabled = len(rows) <= self.page_size
+
+    def embed(self) -> discord.Embed:
+        return self.render(self.rows, len(self.cursors))
+
+    @discord.ui.button(label="◀ Назад", style=discord.ButtonStyle.secondary)
+    async def prev_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if len(self.cursors) > 1:
+            self.cursors.pop()
+        await self.load()
+        await interaction.response.edit_message(embed=self.embed(), view=self)
+
+    @discord.ui.button(label="Дальше ▶", style=discord.ButtonStyle.primary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if self.rows:
+            self.cursors.append(self.cursor_of(self.rows[-1]))
+        await self.load()
+        await interaction.response.edit_message(embed=self.embed(), view=self)
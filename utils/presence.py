@@ -0,0 +1,56 @@
+class VoicePresence:
+    """
+    Живой индекс участников (без ботов), которые сейчас в голосовых каналах.
+
+    Обновляется инкрементально из on_voice_state_update и заполняется заново при on_ready,
+    поэтому количество людей в голосе на сервере или в канале читается за O(1).
+    """
+
+    def __init__(self):
+        self._location: dict[tuple[int, int], int] = {}   # (guild_id, member_id) → channel_id
+        self._channels: dict[int, set[int]] = {}          # channel_id → member_id
+        self._guild_counts: dict[int, int] = {}
+
+    def move(self, guild_id: int, member_id: int, channel_id: int | None):
+        """Участник перешёл в channel_id (None — вышел из голоса)"""
+        key = (guild_id, member_id)
+        old = self._location.pop(key, None)
+        if old is not None:
+            members = self._channels.get(old)
+            if members is not None:
+                members.discard(member_id)
+                if not members:
+                    del self._channels[old]
+            self._guild_counts[guild_id] -= 1
+
+        if channel_id is not None:
+            self._location[key] = channel_id
+            self._channels.setdefault(channel_id, set()).add(member_id)
+            self._guild_counts[guild_id] = self._guild_counts.get(guild_id, 0) + 1
+
+    def seed(self, guilds):
+        """Полностью перестраивает индекс по текущему состоянию серверов"""
+        self._location.clear()
+        self._channels.clear()
+        self._guild_counts.clear()
+        for guild in guilds:
+            self._guild_counts[guild.id] = 0
+            for vc in guild.voice_channels:
+                for member in vc.members:
+                    if not member.bot:
+                        self.move(guild.id, member.id, vc.id)
+
+    def guild_count(self, guild_id: int) -> int:
+        return self._guild_counts.get(guild_id, 0)
+
+    def channel_count(self, channel_id: int) -> int:
+        return len(self._channels.get(channel_id, ()))
+
+    def channel_members(self, channel_id: int) -> frozenset[int]:
+        return frozenset(self._channels.get(channel_id, ()))
+
+    def channel_of(self, guild_id: int, member_id: int) -> int | None:
+        return self._location.get((guild_id, member_id))
+
+
+presence = VoicePresence()
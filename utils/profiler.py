@@ -0,0 +1,198 @@
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from utils.metrics import metrics
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Кадры event loop, когда он ничего не делает и ждёт событий
+IDLE_FUNCTIONS = {"select", "poll", "epoll", "_run_once"}
+# Точка входа есть в любом стеке — обработчиком её не считаем
+ENTRY_POINTS = {"<module>", "main"}
+
+
+def _qualname(code) -> str:
+    # co_qualname есть только с Python 3.11
+    return getattr(code, "co_qualname", code.co_name)
+
+
+def _project_frame(frame) -> str | None:
+    """Ближайший к вершине стека кадр кода бота: 'cogs/moderation.py:Moderation.warn:120'"""
+    while frame is not None:
+        path = frame.f_code.co_filename
+        if path.startswith(PROJECT_ROOT) and "site-packages" not in path and _qualname(frame.f_code) not in ENTRY_POINTS:
+            relative = os.path.relpath(path, PROJECT_ROOT)
+            return f"{relative}:{_qualname(frame.f_code)}:{frame.f_lineno}"
+        frame = frame.f_back
+    return None
+
+
+def _folded_stack(frame) -> str:
+    """Стек в «свёрнутом» формате (корень;...;вершина) — его понимают flamegraph-инструменты"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{_qualname(code)}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class Sampler:
+    """Сэмплирующий профайлер потока event loop: снимает стек раз в interval секунд"""
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self.leaves: Counter[str] = Counter()
+        self.samples = 0
+        self.idle = 0
+
+    def run(self, seconds: float):
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.samples += 1
+                if frame.f_code.co_name in IDLE_FUNCTIONS:
+                    self.idle += 1
+                else:
+                    self.stacks[_folded_stack(frame)] += 1
+                    self.leaves[_project_frame(frame) or f"{frame.f_code.co_filename}:{_qualname(frame.f_code)}"] += 1
+            time.sleep(self.interval)
+
+    def report(self, top: int = 40) -> str:
+        busy = self.samples - self.idle
+        out = [
+            f"Сэмплов: {self.samples} (шаг {self.interval * 1000:.0f} мс), "
+            f"event loop занят в {busy / max(self.samples, 1):.0%} из них",
+            "",
+            "=== Код бота, на котором чаще всего стоял event loop ===",
+        ]
+        for place, n in self.leaves.most_common(top):
+            out.append(f"{n:>6} {n / max(busy, 1):>6.1%}  {place}")
+        out += ["", "=== Полные стеки (root;...;leaf) ==="]
+        for stack, n in self.stacks.most_common(top):
+            out.append(f"{n:>6}  {stack}")
+        return "\n".join(out) + "\n"
+
+
+async def profile(seconds: float, mode: str = "sampling", top: int = 40) -> str:
+    """
+    Профилирует поток event loop seconds секунд и возвращает текстовый отчёт.
+    sampling — почти без накладных расходов; cprofile — точные счётчики вызовов, но замедляет бота.
+    """
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profiler.disable()
+        buffer = io.StringIO()
+        stats = pstats.Stats(profiler, stream=buffer)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top)
+        stats.sort_stats(pstats.SortKey.TIME).print_stats(top)
+        return buffer.getvalue()
+
+    sampler = Sampler(threading.get_ident())
+    await asyncio.to_thread(sampler.run, seconds)
+    return sampler.report(top)
+
+
+class SlowCallbackWatchdog:
+    """
+    Сторожевой поток: если event loop не отвечает дольше threshold секунд,
+    снимает его стек и, когда loop освободится, пишет в лог длительность,
+    задачу (для событий discord.py — имя события) и обработчик Cog.
+    На сам event loop добавляет только одну задачу-пульс.
+    """
+
+    def __init__(self, threshold: float | None = None, interval: float = 0.05):
+        self.threshold = threshold
+        self.interval = interval
+        self._beat = time.monotonic()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread: int | None = None
+        self._pulse: asyncio.Task | None = None
+        self._thread: threading.Thread | None = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        if self.threshold is None:
+            self.threshold = int(os.getenv("SLOW_CALLBACK_MS", "250")) / 1000
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopped.clear()
+        self._pulse = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="slow-callback-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._pulse is not None:
+            self._pulse.cancel()
+            self._pulse = None
+        self._thread = None
+
+    async def _heartbeat(self):
+        while True:
+            self._beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+
+    def _watch(self):
+        stall = None  # (начало, задача, обработчик, стек)
+        while not self._stopped.wait(self.interval):
+            beat = self._beat
+            blocked = time.monotonic() - beat - self.interval
+            if stall is None and blocked > self.threshold:
+                stall = (beat, *self._snapshot())
+            elif stall is not None and beat != stall[0]:
+                self._report(beat - stall[0] - self.interval, *stall[1:])
+                stall = None
+
+    def _snapshot(self) -> tuple[str, str, str]:
+        frame = sys._current_frames().get(self._loop_thread)
+        if frame is None:
+            return "—", "—", ""
+        task = self._running_task(frame)
+        task_name = task.get_name() if task is not None else "—"
+        return task_name, _project_frame(frame) or "—", _folded_stack(frame)
+
+    def _running_task(self, frame) -> asyncio.Task | None:
+        """Задача, корутина которой сейчас в стеке потока event loop (или None — обычный callback)"""
+        stack = set()
+        while frame is not None:
+            stack.add(id(frame))
+            frame = frame.f_back
+        try:
+            running = asyncio.all_tasks(self._loop)
+        except RuntimeError:
+            return None
+        for task in running:
+            # Внешний кадр корутины задачи; у выполняющейся задачи он есть в стеке потока
+            outer = task.get_stack(limit=1)
+            if outer and id(outer[0]) in stack:
+                return task
+        return None
+
+    def _report(self, duration: float, task_name: str, handler: str, stack: str):
+        metrics.inc("greenfild_slow_callbacks_total", handler=handler.rsplit(":", 1)[0])
+        metrics.observe("greenfild_slow_callback_seconds", duration)
+        leaf = stack.rsplit(";", 3)[-3:] if stack else []
+        print(
+            f"🐢 Event loop заблокирован на {duration * 1000:.0f} мс: "
+            f"задача {task_name}, обработчик {handler}, стек …{';'.join(leaf)}"
+        )
+
+
+# Порог — SLOW_CALLBACK_MS в .env (по умолчанию 250 мс)
+watchdog = SlowCallbackWatchdog()
@@ -0,0 +1,166 @@
+import asyncio
+import hmac
+import os
+import socket
+import sqlite3
+import aiohttp
+from database import db
+from utils.bans import JOURNAL_AFTER, bans
+from utils.cluster import cluster
+
+# Как часто забирать журналы других инстансов (секунды) и сколько записей за запрос
+PULL_INTERVAL = 30
+PAGE_SIZE = 500
+
+
+def parse_peers(value: str) -> dict[str, str]:
+    """'partner=https://host:8766,stage=sqlite:///srv/stage/greenfild.db' → {имя: адрес}"""
+    peers = {}
+    for part in value.split(","):
+        name, _, address = part.strip().partition("=")
+        if name and address:
+            peers[name] = address
+    return peers
+
+
+class HttpJournalSource:
+    """Журнал банов другого инстанса по HTTP (его BanReplicator с BAN_JOURNAL_PORT)"""
+
+    def __init__(self, url: str, token: str | None):
+        self.url = url.rstrip("/") + "/ban-journal"
+        self.headers = {"Authorization": f"Bearer {token}"} if token else {}
+
+    async def fetch(self, session: aiohttp.ClientSession, after: int, limit: int) -> dict:
+        async with session.get(self.url, params={"after": after, "limit": limit}, headers=self.headers) as response:
+            response.raise_for_status()
+            return await response.json()
+
+
+class SqliteJournalSource:
+    """Журнал из файла БД другого инстанса на этой же машине (только чтение)"""
+
+    def __init__(self, path: str, name: str):
+        self.path = path
+        self.name = name
+
+    async def fetch(self, session: aiohttp.ClientSession, after: int, limit: int) -> dict:
+        def read():
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            try:
+                return conn.execute(JOURNAL_AFTER, (after, limit)).fetchall()
+            finally:
+                conn.close()
+
+        rows = await asyncio.to_thread(read)
+        return {"instance": self.name, "entries": [(*row[:6], row[6] or self.name) for row in rows]}
+
+
+class BanReplicator:
+    """
+    Репликация глобальных банов между инстансами бота через ban_journal.
+
+    - отдаёт свой журнал по HTTP: GET /ban-journal?after=<seq>&limit=<n> (BAN_JOURNAL_PORT,
+      доступ по BAN_REPLICATION_TOKEN);
+    - раз в PULL_INTERVAL забирает у каждого инстанса из BAN_REPLICATION_PEERS записи после
+      сохранённого курсора и применяет их (bans.apply_remote — идемпотентно, вместе с курсором);
+    - записи с origin этого инстанса (INSTANCE_NAME) пропускаются — свои баны обратно не возвращаются.
+    Имя инстанса в BAN_REPLICATION_PEERS должно совпадать с его INSTANCE_NAME.
+    Инстанс, который был выключен, догоняет только разницу после своего курсора.
+    Изменения передаются в on_change(entries) — бан/разбан на серверах.
+
+    В кластере журналы других инстансов забирает и отдаёт только основной процесс,
+    остальные лишь подтягивают в кэш записи общей БД (bans.sync).
+    """
+
+    def __init__(self, on_change):
+        self.on_change = on_change
+        self.instance = os.getenv("INSTANCE_NAME") or socket.gethostname()
+        self.token = os.getenv("BAN_REPLICATION_TOKEN")
+        self.port = os.getenv("BAN_JOURNAL_PORT", "")
+        self.peers = {}
+        for name, address in parse_peers(os.getenv("BAN_REPLICATION_PEERS", "")).items():
+            if address.startswith("sqlite:///"):
+                self.peers[name] = SqliteJournalSource(address.removeprefix("sqlite:///"), name)
+            else:
+                self.peers[name] = HttpJournalSource(address, self.token)
+        self._tasks: list[asyncio.Task] = []
+
+    def start(self):
+        if self._tasks:
+            return
+        self._tasks.append(asyncio.create_task(self._pull_loop()))
+        if cluster.primary and self.port.isdigit():
+            if self.token:
+                self._tasks.append(asyncio.create_task(self._serve(int(self.port))))
+            else:
+                print("⚠️ BAN_JOURNAL_PORT задан без BAN_REPLICATION_TOKEN — журнал банов не публикуется")
+
+    def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    # === Забор журналов ===
+    async def _pull_loop(self):
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30)) as session:
+            while True:
+                try:
+                    # Изменения из других процессов кластера (общая БД) — в кэш
+                    await bans.sync()
+                    if cluster.primary:
+                        for peer, source in self.peers.items():
+                            await self.pull(session, peer, source)
+                except Exception as e:
+                    print(f"❌ Ошибка репликации банов: {type(e).__name__}: {e}")
+                await asyncio.sleep(PULL_INTERVAL)
+
+    async def pull(self, session: aiohttp.ClientSession, peer: str, source) -> int:
+        """Забирает и применяет записи журнала peer после курсора; возвращает число изменений"""
+        changes = 0
+        while True:
+            after = await bans.cursor(peer)
+            try:
+                page = await source.fetch(session, after, PAGE_SIZE)
+            except (aiohttp.ClientError, asyncio.TimeoutError, sqlite3.Error) as e:
+                print(f"⚠️ Журнал банов {peer} недоступен: {type(e).__name__}: {e}")
+                return changes
+            entries = [tuple(entry) for entry in page["entries"]]
+            if not entries:
+                return changes
+            foreign = [entry for entry in entries if entry[6] != self.instance]
+            changed = await bans.apply_remote(peer, foreign, entries[-1][0])
+            if changed:
+                changes += len(changed)
+                print(f"🔁 Журнал банов {peer}: записи {entries[0][0]}–{entries[-1][0]}, изменений {len(changed)}")
+                await self.on_change(changed)
+            if len(entries) < PAGE_SIZE:
+                return changes
+
+    # === Отдача своего журнала ===
+    async def _serve(self, port: int):
+        from aiohttp import web
+
+        async def journal(request: web.Request):
+            supplied = request.headers.get("Authorization", "")
+            if not hmac.compare_digest(supplied, f"Bearer {self.token}"):
+                return web.json_response({"error": "unauthorized"}, status=401)
+            try:
+                after = int(request.query.get("after", 0))
+                limit = min(int(request.query.get("limit", PAGE_SIZE)), PAGE_SIZE)
+            except ValueError:
+                return web.json_response({"error": "bad cursor"}, status=400)
+            rows = await db.fetchall(JOURNAL_AFTER, (after, limit))
+            # origin NULL — бан выдан здесь: подставляем имя инстанса, чтобы он не вернулся обратно
+            entries = [(*row[:6], row[6] or self.instance) for row in rows]
+            return web.json_response({"instance": self.instance, "entries": entries})
+
+        app = web.Application()
+        app.router.add_get("/ban-journal", journal)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, os.getenv("BAN_JOURNAL_HOST", "0.0.0.0"), port).start()
+        print(f"🔁 Журнал банов доступен на порту {port}")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
@@ -0,0 +1,277 @@
+import asyncio
+import gzip
+import json
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import lru_cache
+from database import db
+from utils.cluster import cluster
+from utils.settings import settings
+
+# Как часто проверять таблицы (секунды), сколько строк переносить за раз и пауза между порциями,
+# чтобы архивация не занимала поток-писатель надолго
+RUN_INTERVAL = 3600
+BATCH_SIZE = 500
+BATCH_PAUSE = 0.2
+# Сколько свободных страниц возвращать файлу за один шаг incremental_vacuum
+VACUUM_PAGES = 1000
+
+
+@dataclass(frozen=True)
+class ArchivedTable:
+    name: str
+    key: str                  # первичный ключ (по нему удаляем и убираем дубли при чтении)
+    time: str                 # SQL-выражение времени строки: по нему срок хранения и месяц архива
+    condition: str = "1"      # какие строки вообще можно архивировать
+    indexed: tuple[str, ...] = ()  # столбцы фильтров: их значения за месяц хранятся в индексе месяца
+
+
+TABLES = {
+    "assignment_logs": ArchivedTable(
+        "assignment_logs", "id", "timestamp", indexed=("assigner_id", "assigned_id", "role_type")
+    ),
+    # Только закрытые заявки: открытые и принятые живут в индексе utils/tickets.py.
+    # Условие и время совпадают с частичным индексом idx_tech_tickets_closed
+    "tech_tickets": ArchivedTable("tech_tickets", "ticket_id", "closed_at", "status = 'closed'"),
+    # Истёкшие варны снимает планировщик модерации; здесь — то, что осталось (например, после простоя)
+    "warns": ArchivedTable("warns", "id", "expires_at"),
+}
+
+
+def archive_dir() -> str:
+    return os.getenv("ARCHIVE_DIR", "archive")
+
+
+def month_of(timestamp: int) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m")
+
+
+def archive_path(table: str, month: str) -> str:
+    return os.path.join(archive_dir(), table, f"{month}.jsonl.gz")
+
+
+def index_path(table: str, month: str) -> str:
+    return os.path.join(archive_dir(), table, f"{month}.idx.json")
+
+
+def archive_months(table: str) -> list[str]:
+    """Месяцы, за которые есть архив таблицы, новые первыми"""
+    try:
+        names = os.listdir(os.path.join(archive_dir(), table))
+    except FileNotFoundError:
+        return []
+    return sorted((name.removesuffix(".jsonl.gz") for name in names if name.endswith(".jsonl.gz")), reverse=True)
+
+
+@lru_cache(maxsize=8)
+def _load_month(path: str, mtime_ns: int, size: int) -> tuple[dict, ...]:
+    # mtime и размер — часть ключа кэша: дописанный файл перечитывается
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return tuple(json.loads(line) for line in f if line.strip())
+
+
+def read_month(table: str, month: str) -> tuple[dict, ...]:
+    path = archive_path(table, month)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return ()
+    return _load_month(path, stat.st_mtime_ns, stat.st_size)
+
+
+@lru_cache(maxsize=1024)
+def _load_index(path: str, mtime_ns: int) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        index = json.load(f)
+    index["values"] = {column: set(values) for column, values in index["values"].items()}
+    return index
+
+
+def month_index(table: str, month: str) -> dict | None:
+    """
+    Индекс месяца: {"size": размер архива, "rows": строк, "values": {столбец фильтра: {значения}}}.
+    None — индекса нет или он описывает файл другого размера (упали между записью архива и индекса):
+    такой месяц читается целиком.
+    """
+    path = index_path(table, month)
+    try:
+        index = _load_index(path, os.stat(path).st_mtime_ns)
+        size = os.stat(archive_path(table, month)).st_size
+    except (FileNotFoundError, ValueError, KeyError):
+        return None
+    return index if index["size"] == size else None
+
+
+def _may_contain(index: dict, filters: dict) -> bool:
+    return all(
+        value in index["values"][column]
+        for column, value in filters.items() if column in index["values"]
+    )
+
+
+def _history(table: str, filters: dict, order, before: tuple | None, limit: int) -> list[dict]:
+    key = TABLES[table].key
+    found: dict = {}
+    for month in archive_months(table):
+        # Месяцы новее курсора целиком пропускаем
+        if before is not None and month > month_of(before[0]):
+            continue
+        # По индексу месяца — без распаковки, если строк с такими значениями там точно нет
+        index = month_index(table, month)
+        if index is not None and not _may_contain(index, filters):
+            continue
+        for row in read_month(table, month):
+            if (before is None or order(row) < before) and all(row[c] == v for c, v in filters.items()):
+                found[row[key]] = row
+        # Месяцы идут от новых к старым: набрали страницу — старше искать незачем
+        if len(found) >= limit:
+            break
+    return sorted(found.values(), key=order, reverse=True)[:limit]
+
+
+async def read_history(table: str, filters: dict, order, before: tuple | None, limit: int) -> list[dict]:
+    """
+    Архивные строки таблицы, новые первыми: order(row) < before и row[столбец] == значение
+    для filters. order(row) — (время, ключ), то же время, по которому строка попала в архив
+    за свой месяц. Месяцы новее курсора и месяцы, в индексе которых нет значений фильтров,
+    не распаковываются. Файлы читаются в отдельном потоке; последние месяцы держатся в памяти.
+    """
+    return await asyncio.to_thread(_history, table, filters, order, before, limit)
+
+
+class Archiver:
+    """
+    Фоновый перенос старых строк в помесячные архивы archive/<таблица>/<ГГГГ-ММ>.jsonl.gz.
+
+    Срок хранения по таблицам — settings.retention (дни, 0 — хранить всё). Строки старше срока
+    переносятся порциями по BATCH_SIZE: сначала дописываются в архив (новым gzip-блоком в конец
+    файла), затем удаляются из БД одной транзакцией вместе со счётчиком archived:<таблица>
+    в bot_meta. Если процесс упал между этими шагами, порция попадёт в архив повторно — при чтении
+    дубли отбрасываются по первичному ключу.
+
+    Рядом с архивом месяца лежит <ГГГГ-ММ>.idx.json — значения столбцов фильтров за месяц, чтобы
+    поиск не распаковывал месяцы без нужных строк. После прохода свободные страницы возвращаются
+    файлу через PRAGMA incremental_vacuum, тоже небольшими шагами.
+
+    В кластере работает только основной процесс.
+    """
+
+    def __init__(self):
+        self._task: asyncio.Task | None = None
+        self._columns: dict[str, list[str]] = {}
+
+    def start(self):
+        if self._task is None and cluster.primary:
+            self._task = asyncio.create_task(self._loop())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run()
+            except Exception as e:
+                print(f"❌ Ошибка архивации: {type(e).__name__}: {e}")
+            await asyncio.sleep(RUN_INTERVAL)
+
+    async def run(self) -> dict[str, int]:
+        """Один проход по всем таблицам; возвращает число перенесённых строк по таблицам"""
+        moved = {}
+        now = int(time.time())
+        for table, days in settings.retention.items():
+            if days <= 0 or table not in TABLES:
+                continue
+            total = 0
+            while count := await self.archive_batch(TABLES[table], now - days * 86400):
+                total += count
+                await asyncio.sleep(BATCH_PAUSE)
+            if total:
+                moved[table] = total
+                print(f"🗄️ В архив {table}: {total} строк старше {days} дн.")
+        await self.vacuum()
+        return moved
+
+    async def columns(self, table: str) -> list[str]:
+        if table not in self._columns:
+            rows = await db.fetchall("SELECT name FROM pragma_table_info(?)", (table,))
+            self._columns[table] = [name for name, in rows]
+        return self._columns[table]
+
+    async def archive_batch(self, table: ArchivedTable, cutoff: int) -> int:
+        columns = await self.columns(table.name)
+        rows = await db.fetchall(
+            f"SELECT {', '.join(columns)}, {table.time} FROM {table.name} "
+            f"WHERE {table.condition} AND {table.time} < ? LIMIT ?",
+            (cutoff, BATCH_SIZE)
+        )
+        if not rows:
+            return 0
+
+        by_month: dict[str, list[dict]] = {}
+        for *values, row_time in rows:
+            by_month.setdefault(month_of(row_time), []).append(dict(zip(columns, values)))
+        await asyncio.to_thread(self._append, table, by_month)
+
+        key_index = columns.index(table.key)
+        async with db.transaction() as tx:
+            await tx.executemany(f"DELETE FROM {table.name} WHERE {table.key} = ?", [(row[key_index],) for row in rows])
+            await tx.execute(
+                "INSERT INTO bot_meta (key, value) VALUES (?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = value + excluded.value",
+                (f"archived:{table.name}", len(rows))
+            )
+        return len(rows)
+
+    @staticmethod
+    def _append(table: ArchivedTable, by_month: dict[str, list[dict]]):
+        os.makedirs(os.path.join(archive_dir(), table.name), exist_ok=True)
+        for month, rows in by_month.items():
+            path = archive_path(table.name, month)
+            # Индекс читаем до дописывания: после него размер файла уже не совпадёт
+            index = month_index(table.name, month)
+            if index is None:
+                # Индекса нет или он устарел — собираем заново по уже записанным строкам
+                index = Archiver._build_index(table, read_month(table.name, month))
+            with gzip.open(path, "at", encoding="utf-8") as f:
+                f.writelines(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+            Archiver._write_index(table, month, index, rows)
+
+    @staticmethod
+    def _build_index(table: ArchivedTable, rows) -> dict:
+        return {"rows": len(rows), "values": {c: {row[c] for row in rows} for c in table.indexed}}
+
+    @staticmethod
+    def _write_index(table: ArchivedTable, month: str, index: dict, rows: list[dict]):
+        values = {c: set(index["values"].get(c, ())) | {row[c] for row in rows} for c in table.indexed}
+        data = {
+            "size": os.stat(archive_path(table.name, month)).st_size,
+            "rows": index["rows"] + len(rows),
+            "values": {c: sorted(v, key=str) for c, v in values.items()},
+        }
+        path = index_path(table.name, month)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(path + ".tmp", path)
+
+    async def vacuum(self) -> int:
+        """Возвращает файлу свободные страницы; возвращает их число"""
+        released = 0
+        free = await db.fetchval("PRAGMA freelist_count", default=0)
+        while free > 0:
+            await db.executescript(f"PRAGMA incremental_vacuum({VACUUM_PAGES})")
+            left = await db.fetchval("PRAGMA freelist_count", default=0)
+            # Без auto_vacuum=INCREMENTAL страницы не освобождаются — не крутимся впустую
+            if left >= free:
+                break
+            released += free - left
+            free = left
+            await asyncio.sleep(BATCH_PAUSE)
+        return released
+
+
+archiver = Archiver()
@@ -0,0 +1,64 @@
+import discord
+from database import db
+from utils.cluster import cluster
+
+# Уровни доступа → ключи ролей из project_roles
+ACCESS_LEVELS = {
+    # Главная панель
+    "leadership": ("leadership", "project_team"),
+    # Панели управления и назначения
+    "management": ("leadership", "project_team", "chief_admin", "deputy_chief", "chief_curator"),
+    # Модерация (баны, варны)
+    "moderator": ("chief_admin", "deputy_chief", "chief_curator", "senior_admin", "admin"),
+}
+
+
+class RoleRegistry:
+    """
+    Кэш таблицы project_roles в памяти.
+
+    Загружается один раз при старте и обновляется сразу при записи через set().
+    Уровни доступа заранее компилируются в множества ID ролей,
+    поэтому проверка прав — одно пересечение множеств без обращения к БД.
+    """
+
+    def __init__(self):
+        self._roles: dict[str, int] = {}
+        self._levels: dict[str, frozenset[int]] = {level: frozenset() for level in ACCESS_LEVELS}
+
+    def _compile(self):
+        self._levels = {
+            level: frozenset(self._roles[key] for key in keys if self._roles.get(key))
+            for level, keys in ACCESS_LEVELS.items()
+        }
+
+    async def load(self):
+        """Загружает все привязки ролей из БД"""
+        rows = await db.fetchall("SELECT role_name, role_id FROM project_roles")
+        self._roles = {name: role_id for name, role_id in rows}
+        self._compile()
+        print(f"🎭 Загружено привязок ролей: {len(self._roles)}")
+
+    async def set(self, role_name: str, role_id: int):
+        """Сохраняет привязку в БД и сразу обновляет кэш"""
+        await db.execute(
+            "INSERT OR REPLACE INTO project_roles (role_name, role_id) VALUES (?, ?)",
+            (role_name, role_id)
+        )
+        self._roles[role_name] = role_id
+        self._compile()
+        # Остальные процессы кластера перечитают привязки из БД
+        cluster.publish("roles")
+
+    def get(self, role_name: str) -> int | None:
+        return self._roles.get(role_name)
+
+    def has_access(self, user: discord.Member, level: str) -> bool:
+        """Есть ли у пользователя хотя бы одна роль заданного уровня доступа"""
+        allowed = self._levels[level]
+        if not allowed:
+            return False
+        return not allowed.isdisjoint(r.id for r in getattr(user, "roles", ()))
+
+
+roles = RoleRegistry()
@@ -0,0 +1,86 @@
+import asyncio
+import heapq
+import time
+from collections.abc import Awaitable, Callable, Hashable
+
+# Через сколько секунд повторить пачку, если обработчик упал
+RETRY_DELAY = 60
+
+
+class ExpiryScheduler:
+    """
+    Планировщик сроков на min-heap.
+
+    Хранит ближайшие дедлайны вида (когда, тип, ключ), спит ровно до ближайшего
+    и передаёт наступившие элементы обработчику своего типа пачкой.
+    Перенос или отмена срока — ленивые: устаревшие записи в куче просто пропускаются.
+    """
+
+    def __init__(self, batch_size: int = 500):
+        self.batch_size = batch_size
+        self._handlers: dict[str, Callable[[list], Awaitable[None]]] = {}
+        self._heap: list[tuple[int, str, Hashable]] = []
+        self._deadlines: dict[tuple[str, Hashable], int] = {}
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def register(self, kind: str, handler: Callable[[list], Awaitable[None]]):
+        """handler(keys: list) — async, вызывается с пачкой наступивших ключей"""
+        self._handlers[kind] = handler
+
+    def schedule(self, kind: str, key: Hashable, deadline: int):
+        self._deadlines[(kind, key)] = deadline
+        heapq.heappush(self._heap, (deadline, kind, key))
+        if self._heap[0][0] == deadline:
+            self._wakeup.set()
+
+    def cancel(self, kind: str, key: Hashable):
+        self._deadlines.pop((kind, key), None)
+
+    def clear(self, kind: str):
+        """Снимает все сроки заданного типа (перед перезагрузкой из БД)"""
+        self._deadlines = {k: d for k, d in self._deadlines.items() if k[0] != kind}
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _pop_due(self, now: int) -> dict[str, list[Hashable]]:
+        due: dict[str, list[Hashable]] = {}
+        count = 0
+        while self._heap and self._heap[0][0] <= now and count < self.batch_size:
+            deadline, kind, key = heapq.heappop(self._heap)
+            # Срок перенесён или отменён — запись устарела
+            if self._deadlines.get((kind, key)) != deadline:
+                continue
+            del self._deadlines[(kind, key)]
+            due.setdefault(kind, []).append(key)
+            count += 1
+        return due
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            timeout = max(self._heap[0][0] - time.time(), 0) if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+            now = int(time.time())
+            due = self._pop_due(now)
+            for kind, keys in due.items():
+                try:
+                    await self._handlers[kind](keys)
+                except Exception as e:
+                    print(f"❌ Ошибка обработки истёкших сроков ({kind}): {e}")
+                    for key in keys:
+                        self.schedule(kind, key, now + RETRY_DELAY)
@@ -0,0 +1,156 @@
+import json
+import os
+
+SETTINGS_PATH = "settings.json"
+
+JOIN_PIPELINE_DEFAULTS = {
+    "workers": 4,                    # обработчиков очереди входов
+    "per_guild_concurrency": 2,      # одновременных выдач ролей на одном сервере
+    "dm_queue_limit": 1000,          # максимум приветствий в очереди (лишние — самые старые — отбрасываются)
+    "dm_overload_policy": "defer",   # 'defer' — отложить до разгрузки, 'drop' — отбрасывать при перегрузке
+    "overload_threshold": 200,       # очередь ролей, начиная с которой сервер считается перегруженным
+    "max_dm_lag_seconds": 600,       # приветствие старше этого уже не отправляем
+}
+
+# Срок хранения строк в БД по таблицам (дни; 0 — не архивировать), см. utils/retention.py
+RETENTION_DEFAULTS = {
+    "assignment_logs": 365,
+    "tech_tickets": 90,
+    "warns": 30,
+}
+
+# Действия лестницы эскалации варнов (moderation.escalation в settings.json)
+ESCALATION_ACTIONS = ("timeout", "kick", "ban", "global_ban")
+
+
+class Settings:
+    """
+    settings.json в памяти.
+
+    Файл читается один раз; reload_if_changed() (вызывается по таймеру) перечитывает его,
+    только если изменился mtime. Приветствие рендерится заранее, поэтому обработчики
+    событий получают готовые значения без файлового I/O.
+    """
+
+    def __init__(self, path: str = SETTINGS_PATH):
+        self.path = path
+        self._mtime: float | None = None
+        self._data: dict = {}
+        self.welcome_message = ""
+        self.reload()
+
+    def reload(self):
+        """Принудительно перечитывает файл и пересобирает шаблоны"""
+        try:
+            mtime = os.stat(self.path).st_mtime
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            print(f"❌ Файл {self.path} не найден!")
+            return
+        except json.JSONDecodeError as e:
+            print(f"❌ Ошибка в {self.path}: {e} — оставлены прежние настройки")
+            return
+
+        self._data = data
+        self._mtime = mtime
+        self.welcome_message = self._render_welcome()
+
+    def reload_if_changed(self) -> bool:
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            return False
+        if mtime == self._mtime:
+            return False
+        self.reload()
+        print(f"🔄 Настройки {self.path} перезагружены")
+        return True
+
+    def _render_welcome(self) -> str:
+        template = self._data.get("welcome_message")
+        if template is None:
+            print(f"❌ В {self.path} отсутствует поле 'welcome_message'")
+            return ""
+        social_links = os.getenv("SOCIAL_LINKS", "Соцсети не указаны")
+        return template.replace("{social_links}", social_links)
+
+    def _moderation(self, key: str, default: int) -> int:
+        try:
+            return int(self._data.get("moderation", {}).get(key, default))
+        except (TypeError, ValueError):
+            return default
+
+    # === Типизированные значения ===
+    @property
+    def project_name(self) -> str:
+        return self._data.get("project_name", "Greenfild Project")
+
+    @property
+    def max_warns_to_ban(self) -> int:
+        return self._moderation("max_warns_to_ban", 3)
+
+    @property
+    def warn_duration_days(self) -> int:
+        return self._moderation("warn_duration_days", 7)
+
+    @property
+    def warn_escalation(self) -> list[dict]:
+        """
+        Лестница наказаний по числу активных варнов: [{"warns": 3, "action": "ban", "duration": "7d"}, ...]
+        по возрастанию warns; duration "0" — навсегда. Лестница включается явно: без неё — прежнее правило,
+        бан на сервере навсегда при max_warns_to_ban.
+        """
+        steps = []
+        for step in self._data.get("moderation", {}).get("escalation", []):
+            try:
+                warns, action = int(step["warns"]), step["action"]
+            except (KeyError, TypeError, ValueError):
+                print(f"❌ Неверный шаг moderation.escalation в {self.path}: {step}")
+                continue
+            if action not in ESCALATION_ACTIONS:
+                print(f"❌ Неизвестное действие эскалации '{action}' в {self.path}")
+                continue
+            steps.append({"warns": warns, "action": action, "duration": str(step.get("duration", "0"))})
+        if not steps:
+            steps = [{"warns": self.max_warns_to_ban, "action": "ban", "duration": "0"}]
+        return sorted(steps, key=lambda step: step["warns"])
+
+    @property
+    def tech_support_category(self) -> str:
+        return self._data.get("tech_support_category", "🔧 Техподдержка")
+
+    @property
+    def tech_support_max_open_tickets(self) -> int:
+        """Сколько незакрытых заявок может быть у одного пользователя на сервере"""
+        try:
+            return int(self._data.get("tech_support_max_open_tickets", 1))
+        except (TypeError, ValueError):
+            return 1
+
+    @property
+    def join_pipeline(self) -> dict:
+        """Параметры очереди входов (см. utils/joins.py), с умолчаниями"""
+        return {**JOIN_PIPELINE_DEFAULTS, **self._data.get("join_pipeline", {})}
+
+    @property
+    def retention(self) -> dict[str, int]:
+        """Сроки хранения в днях по таблицам (раздел retention), с умолчаниями"""
+        result = dict(RETENTION_DEFAULTS)
+        for table, days in self._data.get("retention", {}).items():
+            try:
+                result[table] = int(days)
+            except (TypeError, ValueError):
+                print(f"❌ Неверный срок хранения retention.{table} в {self.path}: {days}")
+        return result
+
+    @property
+    def currency_name(self) -> str:
+        return self._data.get("currency_name", "G$")
+
+    @property
+    def assets(self) -> dict:
+        return self._data.get("assets", {})
+
+
+settings = Settings()
@@ -0,0 +1,90 @@
+import time
+from dataclasses import dataclass
+from database import db
+from utils.cluster import cluster
+
+
+@dataclass
+class Ticket:
+    ticket_id: int
+    user_id: int
+    guild_id: int
+    channel_id: int
+    status: str                    # 'open' или 'accepted'
+    created_at: int
+    accepted_by: int | None = None
+
+
+class TicketIndex:
+    """
+    Незакрытые заявки техподдержки в памяти: канал → заявка и (сервер, автор) → каналы.
+
+    Загружается из tech_tickets при старте и меняется только через create/accept/close,
+    которые сразу пишут статус и время в БД. Кнопки заявки и лимит открытых заявок
+    на пользователя читают только этот индекс.
+    """
+
+    def __init__(self):
+        self._by_channel: dict[int, Ticket] = {}
+        self._by_author: dict[tuple[int, int], set[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._by_channel)
+
+    def get(self, channel_id: int) -> Ticket | None:
+        return self._by_channel.get(channel_id)
+
+    def open_count(self, guild_id: int, user_id: int) -> int:
+        return len(self._by_author.get((guild_id, user_id), ()))
+
+    async def load(self):
+        """Загружает незакрытые заявки серверов этого процесса"""
+        rows = await db.fetchall(
+            "SELECT ticket_id, user_id, guild_id, channel_id, status, created_at, accepted_by FROM tech_tickets "
+            f"WHERE status != 'closed' AND {cluster.guild_filter()}"
+        )
+        self._by_channel.clear()
+        self._by_author.clear()
+        for row in rows:
+            self._add(Ticket(*row))
+        print(f"🎫 Загружено открытых заявок: {len(self._by_channel)}")
+
+    def _add(self, ticket: Ticket):
+        self._by_channel[ticket.channel_id] = ticket
+        self._by_author.setdefault((ticket.guild_id, ticket.user_id), set()).add(ticket.channel_id)
+
+    def _remove(self, ticket: Ticket):
+        self._by_channel.pop(ticket.channel_id, None)
+        channels = self._by_author.get((ticket.guild_id, ticket.user_id))
+        if channels is not None:
+            channels.discard(ticket.channel_id)
+            if not channels:
+                del self._by_author[(ticket.guild_id, ticket.user_id)]
+
+    async def create(self, user_id: int, guild_id: int, channel_id: int) -> Ticket:
+        now = int(time.time())
+        cursor = await db.execute(
+            "INSERT INTO tech_tickets (user_id, guild_id, channel_id, status, created_at) VALUES (?, ?, ?, 'open', ?)",
+            (user_id, guild_id, channel_id, now)
+        )
+        ticket = Ticket(cursor.lastrowid, user_id, guild_id, channel_id, "open", now)
+        self._add(ticket)
+        return ticket
+
+    async def accept(self, ticket: Ticket, accepted_by: int):
+        await db.execute(
+            "UPDATE tech_tickets SET status = 'accepted', accepted_by = ?, accepted_at = ? WHERE ticket_id = ?",
+            (accepted_by, int(time.time()), ticket.ticket_id)
+        )
+        ticket.status = "accepted"
+        ticket.accepted_by = accepted_by
+
+    async def close(self, ticket: Ticket):
+        await db.execute(
+            "UPDATE tech_tickets SET status = 'closed', closed_at = ? WHERE ticket_id = ?",
+            (int(time.time()), ticket.ticket_id)
+        )
+        self._remove(ticket)
+
+
+tickets = TicketIndex()
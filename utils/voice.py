@@ -0,0 +1,220 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from database import db
+from utils.counters import counters
+
+# Ключ сессии — (user_id, guild_id), как первичный ключ online_time
+SessionKey = tuple[int, int]
+
+UPSERT_ONLINE_TIME = """
+    INSERT INTO online_time (user_id, guild_id, last_join, total_seconds)
+    VALUES (:user_id, :guild_id, :last_join, :seconds)
+    ON CONFLICT (user_id, guild_id) DO UPDATE SET
+        total_seconds = total_seconds + excluded.total_seconds
+            + CASE WHEN :close_at IS NOT NULL AND last_join IS NOT NULL
+                   THEN MAX(:close_at - last_join, 0) ELSE 0 END,
+        last_join = excluded.last_join
+"""
+
+
+UPSERT_HEARTBEAT = """
+    INSERT INTO bot_meta (key, value) VALUES (?, ?)
+    ON CONFLICT (key) DO UPDATE SET value = excluded.value
+"""
+
+# Сколько секунд начислит CLOSE_OPEN_SESSIONS по каждому серверу
+# ({scope} — серверы этого процесса, см. utils.cluster). INDEXED BY: иначе ради GROUP BY
+# планировщик выбирает idx_online_time_guild_total и перебирает всю таблицу
+CLOSED_SECONDS_BY_GUILD = """
+    SELECT guild_id, SUM(MAX(COALESCE(?, last_join) - last_join, 0))
+    FROM online_time INDEXED BY idx_online_time_open
+    WHERE last_join IS NOT NULL AND {scope}
+    GROUP BY guild_id
+"""
+
+# Закрывает открытые в БД сессии на момент cutoff (NULL — без начисления времени)
+CLOSE_OPEN_SESSIONS = """
+    UPDATE online_time
+    SET total_seconds = total_seconds + MAX(COALESCE(?, last_join) - last_join, 0),
+        last_join = NULL
+    WHERE last_join IS NOT NULL AND {scope}
+"""
+
+OPEN_SESSION = """
+    INSERT INTO online_time (user_id, guild_id, last_join) VALUES (?, ?, ?)
+    ON CONFLICT (user_id, guild_id) DO UPDATE SET last_join = excluded.last_join
+"""
+
+
+@dataclass
+class _Pending:
+    """Несброшенные изменения одной строки online_time"""
+    seconds: int = 0              # закрытое в памяти время
+    last_join: int | None = None  # итоговое значение last_join (None = не в голосе)
+    close_at: int | None = None   # закрыть сессию, открытую ещё в БД (начало неизвестно)
+
+
+class VoiceSessionBuffer:
+    """
+    Write-behind буфер голосовых сессий.
+
+    Входы/выходы записываются только в память, а в online_time уходят
+    пачкой одной транзакцией при flush() (по таймеру, при переполнении и при остановке).
+    last_join в БД не NULL только пока участник в голосе.
+
+    Пока synced=True (состояние сверено с Discord), каждый flush пишет heartbeat —
+    момент, до которого данные в памяти точно верны. По нему reconcile() закрывает
+    сессии после простоя, не засчитывая время, когда бот был офлайн.
+
+    В кластере у каждого процесса свой heartbeat (heartbeat_key), а reconcile()
+    трогает только строки его серверов (scope — SQL-условие по guild_id).
+    """
+
+    def __init__(self, max_pending: int = 5000, heartbeat_key: str = "voice_heartbeat", scope: str = "1"):
+        self.max_pending = max_pending
+        self.heartbeat_key = heartbeat_key
+        self._closed_by_guild_sql = CLOSED_SECONDS_BY_GUILD.format(scope=scope)
+        self._close_open_sql = CLOSE_OPEN_SESSIONS.format(scope=scope)
+        self.open: dict[SessionKey, int] = {}
+        self.synced = False
+        self._dirty: dict[SessionKey, _Pending] = {}
+        self._flush_lock = asyncio.Lock()
+        # События, пришедшие во время reconcile(): применяются поверх сверенного состояния
+        self._deferred: list[tuple] | None = None
+        self._reconciling = 0
+
+    def __len__(self) -> int:
+        return len(self._dirty)
+
+    @property
+    def overflowing(self) -> bool:
+        return len(self._dirty) >= self.max_pending
+
+    def join(self, key: SessionKey, ts: int):
+        if self._deferred is not None:
+            self._deferred.append((self.join, key, ts))
+            return
+        if key in self.open:
+            return
+        self.open[key] = ts
+        self._dirty.setdefault(key, _Pending()).last_join = ts
+
+    def leave(self, key: SessionKey, ts: int):
+        if self._deferred is not None:
+            self._deferred.append((self.leave, key, ts))
+            return
+        pending = self._dirty.setdefault(key, _Pending())
+        start = self.open.pop(key, None)
+        if start is not None:
+            pending.seconds += max(ts - start, 0)
+        elif pending.close_at is None and pending.seconds == 0:
+            # Сессия открыта до запуска бота — длительность посчитает БД по last_join
+            pending.close_at = ts
+        pending.last_join = None
+
+    def unflushed_seconds(self, now: int, guild_id: int | None = None) -> dict[SessionKey, int]:
+        """
+        Время, которого ещё нет в online_time.total_seconds: незаписанные закрытые
+        сессии плюс текущие. O(участников в голосе + размер буфера).
+        """
+        extra: dict[SessionKey, int] = {}
+        for key, pending in self._dirty.items():
+            if pending.seconds and (guild_id is None or key[1] == guild_id):
+                extra[key] = pending.seconds
+        for key, start in self.open.items():
+            if guild_id is None or key[1] == guild_id:
+                extra[key] = extra.get(key, 0) + max(now - start, 0)
+        return extra
+
+    async def flush(self) -> int:
+        """Сбрасывает накопленные изменения в БД, возвращает число строк"""
+        async with self._flush_lock:
+            return await self._flush(int(time.time()) if self.synced else None)
+
+    async def _flush(self, heartbeat: int | None = None) -> int:
+        if not self._dirty and heartbeat is None:
+            return 0
+        batch, self._dirty = self._dirty, {}
+        write = asyncio.ensure_future(self._write(batch, heartbeat))
+        try:
+            # Отмена (остановка бота) не прерывает транзакцию: пачка либо записана, либо вернётся в буфер
+            await asyncio.shield(write)
+        except asyncio.CancelledError:
+            await asyncio.wait([write])
+            if write.exception() is not None:
+                self._restore(batch)
+            raise
+        except Exception:
+            self._restore(batch)
+            raise
+        return len(batch)
+
+    async def _write(self, batch: dict[SessionKey, _Pending], heartbeat: int | None):
+        async with db.transaction() as tx:
+            if batch:
+                await tx.executemany(UPSERT_ONLINE_TIME, self._rows(batch))
+            if heartbeat is not None:
+                await tx.execute(UPSERT_HEARTBEAT, (self.heartbeat_key, heartbeat))
+        for (_, guild_id), pending in batch.items():
+            counters.add_voice(guild_id, pending.seconds)
+
+    @staticmethod
+    def _rows(batch: dict[SessionKey, _Pending]) -> list[dict]:
+        return [
+            {
+                "user_id": user_id,
+                "guild_id": guild_id,
+                "last_join": p.last_join,
+                "seconds": p.seconds,
+                "close_at": p.close_at,
+            }
+            for (user_id, guild_id), p in batch.items()
+        ]
+
+    async def reconcile(self, live: set[SessionKey], now: int):
+        """
+        Сверяет сессии с реальным составом голосовых каналов (после старта/переподключения).
+
+        Все открытые в БД сессии закрываются на момент последнего heartbeat
+        (простой не засчитывается), а участники, которые сейчас в голосе, получают
+        новые сессии с now. Всё — одной транзакцией, без запроса на каждого участника.
+
+        live — снимок, сделанный вызывающим без await перед вызовом. Входы и выходы,
+        пришедшие пока идёт сверка, откладываются и применяются после неё по порядку,
+        поэтому не теряются и не оставляют «висящих» сессий.
+        """
+        if self._reconciling == 0:
+            self._deferred = []
+        self._reconciling += 1
+        try:
+            async with self._flush_lock:
+                await self._flush()
+                cutoff = await db.fetchval("SELECT value FROM bot_meta WHERE key = ?", (self.heartbeat_key,))
+                self.open = {key: now for key in live}
+                async with db.transaction() as tx:
+                    closed = await tx.fetchall(self._closed_by_guild_sql, (cutoff,))
+                    await tx.execute(self._close_open_sql, (cutoff,))
+                    await tx.executemany(OPEN_SESSION, [(user_id, guild_id, now) for user_id, guild_id in live])
+                    await tx.execute(UPSERT_HEARTBEAT, (self.heartbeat_key, now))
+                for guild_id, seconds in closed:
+                    counters.add_voice(guild_id, seconds)
+                self.synced = True
+        finally:
+            # Сверки могут идти одна за другой (on_ready + on_resumed) — события применяет последняя
+            self._reconciling -= 1
+            if self._reconciling == 0:
+                deferred, self._deferred = self._deferred, None
+                for apply, key, ts in deferred:
+                    apply(key, max(ts, now))
+
+    def _restore(self, batch: dict[SessionKey, _Pending]):
+        """Возвращает неудавшуюся пачку в буфер, объединяя с новыми событиями"""
+        for key, old in batch.items():
+            new = self._dirty.get(key)
+            if new is None:
+                self._dirty[key] = old
+                continue
+            new.seconds += old.seconds
+            if old.close_at is not None:
+                new.close_at = old.close_at
@@ -0,0 +1,67 @@
+from database import db
+from utils.cluster import cluster
+
+
+class ActiveWarns:
+    """
+    Предупреждения серверов этого процесса в памяти: (user_id, guild_id) → {id: (причина, срок)}.
+
+    Загружается из warns при старте, дальше меняется в момент записи: add() после INSERT,
+    remove() после удаления истёкших. Решение об эскалации в /варн и список в /варны
+    берутся отсюда — без COUNT и SELECT по таблице.
+    """
+
+    def __init__(self):
+        self._by_member: dict[tuple[int, int], dict[int, tuple[str, int]]] = {}
+        self._member_of: dict[int, tuple[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._member_of)
+
+    async def load(self):
+        rows = await db.fetchall(
+            f"SELECT id, user_id, guild_id, reason, expires_at FROM warns WHERE {cluster.guild_filter()}"
+        )
+        self._by_member.clear()
+        self._member_of.clear()
+        for warn_id, user_id, guild_id, reason, expires_at in rows:
+            self.add(warn_id, user_id, guild_id, reason, expires_at)
+
+    def deadlines(self):
+        """(id, срок) всех загруженных варнов — для планировщика"""
+        for (user_id, guild_id), warns in self._by_member.items():
+            for warn_id, (_, expires_at) in warns.items():
+                yield warn_id, expires_at
+
+    def deadline(self, warn_id: int) -> int | None:
+        key = self._member_of.get(warn_id)
+        return None if key is None else self._by_member[key][warn_id][1]
+
+    def add(self, warn_id: int, user_id: int, guild_id: int, reason: str, expires_at: int):
+        key = (user_id, guild_id)
+        self._by_member.setdefault(key, {})[warn_id] = (reason, expires_at)
+        self._member_of[warn_id] = key
+
+    def remove(self, warn_ids):
+        for warn_id in warn_ids:
+            key = self._member_of.pop(warn_id, None)
+            if key is None:
+                continue
+            warns = self._by_member[key]
+            del warns[warn_id]
+            if not warns:
+                del self._by_member[key]
+
+    def active(self, user_id: int, guild_id: int, now: int) -> list[tuple[str, int]]:
+        """Действующие варны участника: [(причина, срок), ...] в порядке выдачи"""
+        warns = self._by_member.get((user_id, guild_id), {})
+        return [(reason, expires_at) for _, (reason, expires_at) in sorted(warns.items()) if expires_at > now]
+
+    def count(self, user_id: int, guild_id: int, now: int) -> int:
+        warns = self._by_member.get((user_id, guild_id))
+        if not warns:
+            return 0
+        return sum(1 for _, expires_at in warns.values() if expires_at > now)
+
+
+active_warns = ActiveWarns()
@@ -0,0 +1,95 @@
+import asyncio
+import aiohttp
+
+# Discord принимает до 10 embed'ов в одном сообщении webhook
+MAX_EMBEDS_PER_MESSAGE = 10
+
+
+class WebhookDispatcher:
+    """
+    Очередь доставки сообщений в один Discord webhook.
+
+    - одна долгоживущая aiohttp-сессия (без нового TCP/TLS на каждое сообщение);
+    - embed'ы, пришедшие пачкой, упаковываются по 10 в один POST;
+    - при 429 ждём retry_after, при 5xx/сетевых ошибках — экспоненциальная задержка;
+    - close() досылает очередь и закрывает сессию.
+    """
+
+    def __init__(self, url: str, username: str, avatar_url: str | None = None,
+                 linger: float = 1.0, max_attempts: int = 5):
+        self.url = url
+        self.username = username
+        self.avatar_url = avatar_url
+        self.linger = linger
+        self.max_attempts = max_attempts
+        self._queue: asyncio.Queue[dict | None] = asyncio.Queue()
+        self._session: aiohttp.ClientSession | None = None
+        self._worker: asyncio.Task | None = None
+
+    def start(self):
+        if self._worker is None:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=15))
+            self._worker = asyncio.create_task(self._run())
+
+    async def close(self):
+        """Досылает всё из очереди и закрывает сессию"""
+        if self._worker is None:
+            return
+        self._queue.put_nowait(None)
+        await self._worker
+        self._worker = None
+        await self._session.close()
+        self._session = None
+
+    def send(self, embed: dict):
+        """Ставит embed в очередь на отправку"""
+        self._queue.put_nowait(embed)
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            embed = await self._queue.get()
+            if embed is None:
+                break
+            batch = [embed]
+            # Даём пачке набраться, но не дольше linger
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self.linger
+            while len(batch) < MAX_EMBEDS_PER_MESSAGE:
+                timeout = deadline - loop.time()
+                try:
+                    embed = self._queue.get_nowait() if timeout <= 0 else await asyncio.wait_for(self._queue.get(), timeout)
+                except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                    break
+                if embed is None:
+                    stopping = True
+                    break
+                batch.append(embed)
+            try:
+                await self._deliver(batch)
+            except Exception as e:
+                print(f"❌ Ошибка доставки webhook: {e}")
+
+    async def _deliver(self, embeds: list[dict]):
+        payload = {"username": self.username, "embeds": embeds}
+        if self.avatar_url:
+            payload["avatar_url"] = self.avatar_url
+
+        delay = 1.0
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                async with self._session.post(self.url, json=payload) as resp:
+                    if resp.status < 300:
+                        return
+                    if resp.status == 429:
+                        retry_after = resp.headers.get("Retry-After")
+                        await asyncio.sleep(float(retry_after) if retry_after else delay)
+                        continue
+                    if resp.status < 500:
+                        print(f"❌ Webhook отклонил сообщение: HTTP {resp.status}")
+                        return
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"⚠️ Ошибка отправки webhook (попытка {attempt}): {e}")
+            await asyncio.sleep(delay)
+            delay *= 2
+        print(f"❌ Webhook: не удалось доставить {len(embeds)} уведомлений после {self.max_attempts} попыток")